@@ -0,0 +1,34 @@
+# Trigram index for admin e-mail search (PostgreSQL only)
+
+from django.db import migrations
+
+# Admin search_fields on email (users and SellerAccountAdmin's user__email)
+# compile to UPPER(email::text) LIKE UPPER('%term%'); a btree cannot serve the
+# leading wildcard, so the index is a pg_trgm GIN on the same expression
+
+
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS users_email_trgm ON users '
+        'USING gin (UPPER(email::text) gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS users_email_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -43,8 +43,8 @@ class CalculationService:
         Returns:
             OrderItemCalculation model instance
         """
-        # Link product if not already linked
-        if not order_item.product:
+        # Link product if not already linked (batch callers prelink in bulk)
+        if order_item.product_id is None:
             order_item.link_product()
         
         # Calculate
@@ -129,11 +129,13 @@ class CalculationService:
         Returns:
             List of OrderItemCalculation instances
         """
+        items = [item for item in order.items.all() if item.is_revenue_item]
+        OrderItem.link_products_bulk([item for item in items if not item.product_id])
+        
         results = []
-        for item in order.items.all():
-            if item.is_revenue_item:
-                calc = self.calculate_order_item(item)
-                results.append(calc)
+        for item in items:
+            calc = self.calculate_order_item(item)
+            results.append(calc)
         return results
     
     def calculate_uncalculated_items(
@@ -151,11 +153,14 @@ class CalculationService:
         Returns:
             Tuple of (processed_count, error_count)
         """
-        items = OrderItem.objects.filter(
+        items = list(OrderItem.objects.filter(
             order__seller_account_id=seller_account_id,
             is_calculated=False,
             item_status='active'
-        ).select_related('order', 'product')[:limit]
+        ).select_related('order', 'product')[:limit])
+        
+        # Link products up front instead of per item in calculate_order_item
+        OrderItem.link_products_bulk([item for item in items if not item.product_id])
         
         processed = 0
         errors = 0
@@ -6,12 +6,43 @@ Background tasks for order synchronization and calculations.
 
 import logging
 from datetime import datetime, timedelta
-from celery import shared_task
+from functools import lru_cache
 
+import redis
+from celery import current_app, shared_task
+
+from django.conf import settings
 from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
+# Max lifetime of a per-seller sync lock (seconds)
+SYNC_LOCK_TIMEOUT = 60 * 60
+
+
+@lru_cache(maxsize=1)
+def _get_lock_client() -> redis.Redis:
+    """
+    Redis client for sync locks, on the Celery broker.
+    
+    The broker is shared by every worker whatever the Django cache backend
+    is (LocMem is per process), so the lock holds across workers.
+    """
+    return redis.Redis.from_url(settings.CELERY_BROKER_URL)
+
+
+def _get_sync_lock(seller_id: int):
+    """
+    Per-seller sync lock.
+    
+    redis-py's Lock stores a random token and releases with a Lua
+    compare-and-delete, so a worker whose lock expired can't delete a newer
+    holder's lock.
+    """
+    return _get_lock_client().lock(
+        f'sync_lock:{seller_id}', timeout=SYNC_LOCK_TIMEOUT, blocking=False
+    )
+
 
 @shared_task(bind=True, max_retries=3, default_retry_delay=60)
 def sync_seller_orders(
@@ -33,15 +64,22 @@ def sync_seller_orders(
     from apps.sellers.models import SellerAccount
     from apps.integrations.trendyol import OrderSyncService
     
+    # Allow only one running sync per seller
+    lock = _get_sync_lock(seller_id)
+    if not lock.acquire():
+        _record_skipped_sync(seller_id, sync_type)
+        return
+    
     try:
         seller = SellerAccount.objects.get(pk=seller_id)
     except SellerAccount.DoesNotExist:
         logger.error(f'Seller account {seller_id} not found')
+        _release_sync_lock(lock)
         return
     
     try:
         service = OrderSyncService(seller)
-        fetched, created, updated = service.sync_orders(
+        fetched, created, updated, skipped = service.sync_orders(
             start_date=start_date,
             end_date=end_date,
             sync_type=sync_type
@@ -49,7 +87,7 @@ def sync_seller_orders(
         
         logger.info(
             f'Sync completed for seller {seller_id}: '
-            f'{fetched} fetched, {created} created, {updated} updated'
+            f'{fetched} fetched, {created} created, {updated} updated, {skipped} skipped'
         )
         
         # Trigger calculations for new orders
@@ -59,12 +97,44 @@ def sync_seller_orders(
             'success': True,
             'fetched': fetched,
             'created': created,
-            'updated': updated
+            'updated': updated,
+            'skipped': skipped
         }
         
     except Exception as e:
         logger.exception(f'Sync failed for seller {seller_id}: {e}')
         raise self.retry(exc=e)
+    
+    finally:
+        _release_sync_lock(lock)
+
+
+def _release_sync_lock(lock):
+    """Release a sync lock if this task still holds it (atomic in Redis)."""
+    try:
+        lock.release()
+    except redis.exceptions.LockError:
+        # Expired (and possibly taken by a newer sync); nothing of ours to release
+        logger.warning(f'Sync lock {lock.name!r} expired before release')
+
+
+def _record_skipped_sync(seller_id: int, sync_type: str):
+    """
+    Log a sync skipped because another one holds the seller's lock.
+    
+    The running sync marks the account completed/failed when it ends, so a
+    'syncing' status set by the trigger still resolves; the skip is recorded
+    on a SellerSyncLog so it is visible in the sync history.
+    """
+    from apps.sellers.models import SellerSyncLog
+    
+    logger.info(f'Sync already running for seller {seller_id}, skipping')
+    sync_log = SellerSyncLog.objects.create(
+        seller_account_id=seller_id,
+        status='started',
+        sync_type=sync_type
+    )
+    sync_log.mark_failed('Başka bir senkronizasyon devam ediyor, bu istek atlandı.')
 
 
 @shared_task
@@ -75,12 +145,20 @@ def sync_all_seller_orders():
     """
     from apps.sellers.models import SellerAccount
     
-    active_sellers = SellerAccount.objects.filter(
+    # Read the ids up front so no query is open while publishing
+    active_sellers = list(SellerAccount.objects.filter(
         is_active=True
-    ).values_list('id', flat=True)
-    
-    for seller_id in active_sellers:
-        sync_seller_orders.delay(seller_id, sync_type='incremental')
+    ).values_list('id', flat=True))
+    
+    # One broker connection/channel for all messages instead of a pool
+    # checkout per delay()
+    with current_app.producer_or_acquire() as producer:
+        for seller_id in active_sellers:
+            sync_seller_orders.apply_async(
+                args=(seller_id,),
+                kwargs={'sync_type': 'incremental'},
+                producer=producer
+            )
     
     logger.info(f'Queued sync for {len(active_sellers)} sellers')
 
@@ -142,8 +220,15 @@ def recalculate_daily_summaries():
     """
     from apps.sellers.models import SellerAccount
     
-    for seller_id in SellerAccount.objects.filter(is_active=True).values_list('id', flat=True):
-        update_daily_summaries.delay(seller_id, days=7)
+    seller_ids = list(SellerAccount.objects.filter(is_active=True).values_list('id', flat=True))
+    
+    with current_app.producer_or_acquire() as producer:
+        for seller_id in seller_ids:
+            update_daily_summaries.apply_async(
+                args=(seller_id,),
+                kwargs={'days': 7},
+                producer=producer
+            )
 
 
 @shared_task
@@ -159,9 +244,11 @@ def update_product_summaries(seller_id: int):
     product_ids = Product.objects.filter(
         seller_account_id=seller_id,
         has_cost_data=True
-    ).values_list('id', flat=True)
+    ).values_list('id', flat=True).order_by('id')
     
-    for product_id in product_ids:
+    count = 0
+    for product_id in product_ids.iterator(chunk_size=2000):
         service.update_product_summary(product_id)
+        count += 1
     
-    logger.info(f'Updated {len(product_ids)} product summaries for seller {seller_id}')
+    logger.info(f'Updated {count} product summaries for seller {seller_id}')
@@ -6,13 +6,20 @@ Includes rate limiting, error handling, and automatic retries.
 """
 
 import time
+import asyncio
+import hashlib
 import logging
 from typing import Optional, Dict, List, Any
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
+import aiohttp
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
+from urllib3.util.retry import Retry
 
 from django.conf import settings
+from django.core.cache import cache
 from core.exceptions import (
     TrendyolAPIError,
     TrendyolAuthenticationError,
@@ -22,27 +29,63 @@ from .error_codes import TRENDYOL_ERROR_MESSAGES
 
 logger = logging.getLogger(__name__)
 
+# Trendyol timestamps are epoch milliseconds (UTC)
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+ONE_MILLISECOND = timedelta(milliseconds=1)
+
+
+def ms_to_datetime(ms: int) -> datetime:
+    """Convert an epoch-milliseconds timestamp to an aware UTC datetime."""
+    return EPOCH + timedelta(milliseconds=ms)
+
+
+def datetime_to_ms(dt: datetime) -> int:
+    """Convert a datetime to epoch milliseconds using integer arithmetic."""
+    if dt.tzinfo is None:
+        # Naive datetimes are treated as local time, like datetime.timestamp()
+        dt = dt.astimezone()
+    return (dt - EPOCH) // ONE_MILLISECOND
+
 
 class RateLimiter:
-    """Simple rate limiter for API requests."""
+    """
+    Sliding-window rate limiter for API requests.
+    
+    Shared by the sync (requests) and async (aiohttp) paths of a client:
+    each request reserves a send time in the same window, so concurrent
+    page fetches are held to the same max_requests per period.
+    """
     
     def __init__(self, max_requests: int = 5, period: float = 1.0):
         self.max_requests = max_requests
         self.period = period
+        # Reserved send times, ascending (may lie in the future)
         self.requests = []
     
-    def wait_if_needed(self):
-        """Wait if rate limit would be exceeded."""
+    def _reserve(self) -> float:
+        """Reserve the next free send slot; return seconds to wait for it."""
         now = time.time()
         # Remove old requests outside the window
         self.requests = [r for r in self.requests if now - r < self.period]
         
+        slot = now
         if len(self.requests) >= self.max_requests:
-            sleep_time = self.period - (now - self.requests[0])
-            if sleep_time > 0:
-                time.sleep(sleep_time)
+            slot = max(now, self.requests[-self.max_requests] + self.period)
         
-        self.requests.append(time.time())
+        self.requests.append(slot)
+        return slot - now
+    
+    def wait_if_needed(self):
+        """Wait if rate limit would be exceeded."""
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+    
+    async def async_wait_if_needed(self):
+        """Async variant of wait_if_needed (does not block the event loop)."""
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
 
 
 class TrendyolClient:
@@ -54,10 +97,23 @@ class TrendyolClient:
     - Rate limiting
     - Error handling with Turkish messages
     - Pagination for order fetching
+    - Short-lived response caching, scoped to the credentials
     """
     
     BASE_URL = "https://api.trendyol.com/sapigw"
     
+    # Response cache TTL (seconds). Kept short for every read: orders keep
+    # changing status (returns, cancellations, deliveries) long after creation
+    CACHE_KEY_PREFIX = 'trendyol_api'
+    LIVE_CACHE_TTL = 60
+    
+    # Connection pool (kept warm across paginated requests)
+    POOL_CONNECTIONS = 16
+    POOL_MAXSIZE = 32
+    
+    # Max in-flight requests for concurrent page fetches
+    MAX_CONCURRENT_REQUESTS = 8
+    
     def __init__(
         self,
         seller_id: str,
@@ -67,12 +123,27 @@ class TrendyolClient:
     ):
         self.seller_id = seller_id
         self.auth = HTTPBasicAuth(api_key, api_secret)
+        # Cached responses are only shared by clients with the same seller id
+        # *and* credentials, so a cache hit never bypasses authentication
+        self._cache_scope = hashlib.blake2b(
+            f'{seller_id}\0{api_key}\0{api_secret}'.encode(), digest_size=16
+        ).hexdigest()
         self.rate_limiter = RateLimiter(max_requests=rate_limit)
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': f'TrendyolProfitability-{seller_id}',
             'Content-Type': 'application/json',
         })
+        
+        # Connection pooling only: retries live in _request's loop alone, so
+        # every attempt goes through the rate limiter and a failing call makes
+        # at most `retries` HTTP attempts
+        adapter = HTTPAdapter(
+            pool_connections=self.POOL_CONNECTIONS,
+            pool_maxsize=self.POOL_MAXSIZE,
+            max_retries=Retry(total=0, read=False, status_forcelist=[], raise_on_status=False)
+        )
+        self.session.mount('https://', adapter)
     
     def _request(
         self,
@@ -80,11 +151,24 @@ class TrendyolClient:
         endpoint: str,
         params: Optional[Dict] = None,
         data: Optional[Dict] = None,
-        retries: int = 3
+        retries: int = 3,
+        cache_ttl: Optional[int] = None
     ) -> Dict:
-        """Make an API request with rate limiting and error handling."""
+        """
+        Make an API request with rate limiting and error handling.
+        
+        If cache_ttl is given, a successful response is cached for that many
+        seconds and served from cache on subsequent identical requests.
+        """
         url = f"{self.BASE_URL}{endpoint}"
         
+        cache_key = None
+        if cache_ttl:
+            cache_key = self._get_cache_key(method, endpoint, params)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
         for attempt in range(retries):
             try:
                 self.rate_limiter.wait_if_needed()
@@ -124,9 +208,12 @@ class TrendyolClient:
                         status_code=response.status_code
                     )
                 
-                return response.json()
+                result = orjson.loads(response.content)
+                if cache_key:
+                    cache.set(cache_key, result, timeout=cache_ttl)
+                return result
                 
-            except requests.RequestException as e:
+            except (requests.RequestException, orjson.JSONDecodeError) as e:
                 if attempt < retries - 1:
                     time.sleep(2 ** attempt)
                     continue
@@ -137,13 +224,19 @@ class TrendyolClient:
         
         raise TrendyolAPIError('Maksimum deneme sayısına ulaşıldı')
     
+    def _get_cache_key(self, method: str, endpoint: str, params: Optional[Dict]) -> str:
+        """Build a cache key from the credential scope, request method, endpoint and params."""
+        raw = f'{method}:{endpoint}:{sorted((params or {}).items())}'
+        return f'{self.CACHE_KEY_PREFIX}:{self._cache_scope}:{hashlib.blake2b(raw.encode()).hexdigest()}'
+    
     def test_connection(self) -> Dict:
         """Test API connection with a simple request."""
         try:
             result = self.get_orders(
                 start_date=datetime.now() - timedelta(days=1),
                 end_date=datetime.now(),
-                size=1
+                size=1,
+                use_cache=False
             )
             return {
                 'success': True,
@@ -161,7 +254,8 @@ class TrendyolClient:
         size: int = 200,
         status: Optional[str] = None,
         order_by_field: str = 'CreatedDate',
-        order_by_direction: str = 'ASC'
+        order_by_direction: str = 'ASC',
+        use_cache: bool = True
     ) -> Dict:
         """
         Fetch orders for a date range.
@@ -174,13 +268,14 @@ class TrendyolClient:
             status: Filter by order status
             order_by_field: Field to sort by
             order_by_direction: ASC or DESC
+            use_cache: Serve/store the response in cache
             
         Returns:
             Dict with orders and pagination info
         """
         # Convert to milliseconds timestamp
-        start_ts = int(start_date.timestamp() * 1000)
-        end_ts = int(end_date.timestamp() * 1000)
+        start_ts = datetime_to_ms(start_date)
+        end_ts = datetime_to_ms(end_date)
         
         params = {
             'startDate': start_ts,
@@ -194,8 +289,10 @@ class TrendyolClient:
         if status:
             params['status'] = status
         
+        cache_ttl = self.LIVE_CACHE_TTL if use_cache else None
+        
         endpoint = f'/suppliers/{self.seller_id}/orders'
-        return self._request('GET', endpoint, params=params)
+        return self._request('GET', endpoint, params=params, cache_ttl=cache_ttl)
     
     def get_all_orders(
         self,
@@ -257,4 +354,96 @@ class TrendyolClient:
             'size': min(size, 100),
         }
         endpoint = f'/suppliers/{self.seller_id}/products'
-        return self._request('GET', endpoint, params=params)
+        return self._request('GET', endpoint, params=params, cache_ttl=self.LIVE_CACHE_TTL)
+    
+    def get_product_pages(self, pages, size: int = 100) -> List[Dict]:
+        """
+        Fetch several product pages concurrently.
+        
+        Args:
+            pages: Page numbers to fetch
+            size: Page size (max 100)
+            
+        Returns:
+            List of page responses in the same order as pages
+        """
+        return asyncio.run(self._gather_product_pages(list(pages), size))
+    
+    async def _gather_product_pages(self, pages: List[int], size: int) -> List[Dict]:
+        """
+        Fetch product pages over one aiohttp session.
+        
+        The semaphore bounds in-flight requests; the send rate is held to the
+        client's rate limit by aget_products.
+        """
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_REQUESTS)
+        
+        async with aiohttp.ClientSession(
+            auth=aiohttp.BasicAuth(self.auth.username, self.auth.password),
+            headers=dict(self.session.headers),
+            timeout=aiohttp.ClientTimeout(total=30)
+        ) as session:
+            async def fetch(page):
+                async with semaphore:
+                    return await self.aget_products(session, page=page, size=size)
+            
+            return await asyncio.gather(*(fetch(page) for page in pages))
+    
+    async def aget_products(
+        self,
+        session: aiohttp.ClientSession,
+        page: int = 0,
+        size: int = 100,
+        retries: int = 3
+    ) -> Dict:
+        """
+        Async variant of get_products using a shared aiohttp session.
+        
+        Every attempt goes through the client's rate limiter, and 429 is
+        backed off and retried as in _request.
+        """
+        params = {
+            'page': page,
+            'size': min(size, 100),
+        }
+        url = f'{self.BASE_URL}/suppliers/{self.seller_id}/products'
+        
+        for attempt in range(retries):
+            try:
+                await self.rate_limiter.async_wait_if_needed()
+                
+                async with session.get(url, params=params) as response:
+                    if response.status == 401:
+                        raise TrendyolAuthenticationError(
+                            TRENDYOL_ERROR_MESSAGES.get(401, 'Kimlik doğrulama hatası'),
+                            status_code=401
+                        )
+                    
+                    if response.status == 429:
+                        if attempt < retries - 1:
+                            await asyncio.sleep(2 ** attempt)
+                            continue
+                        raise TrendyolRateLimitError(
+                            TRENDYOL_ERROR_MESSAGES.get(429, 'Rate limit aşıldı'),
+                            status_code=429
+                        )
+                    
+                    if response.status >= 400:
+                        error_msg = TRENDYOL_ERROR_MESSAGES.get(
+                            response.status,
+                            f'API hatası: {response.status}'
+                        )
+                        raise TrendyolAPIError(error_msg, status_code=response.status)
+                    
+                    return orjson.loads(await response.read())
+                    
+            except (aiohttp.ClientError, asyncio.TimeoutError, orjson.JSONDecodeError) as e:
+                if attempt < retries - 1:
+                    await asyncio.sleep(2 ** attempt)
+                    continue
+                raise TrendyolAPIError(
+                    f'Bağlantı hatası: {str(e)}',
+                    status_code=503
+                )
+        
+        raise TrendyolAPIError('Maksimum deneme sayısına ulaşıldı')
@@ -5,36 +5,96 @@ Handles fetching orders from Trendyol and storing them in the database.
 Supports both full and incremental synchronization.
 """
 
+import asyncio
+import hashlib
 import logging
-from datetime import datetime, timedelta, timezone as dt_timezone
-from typing import Optional, Tuple
+import re
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
 from decimal import Decimal
 
+import aiohttp
+import orjson
+from django.conf import settings
 from django.db import transaction
+from django.db.models import Prefetch, Q
 from django.utils import timezone
 
 from apps.sellers.models import SellerAccount, SellerSyncLog
+from apps.orders.cache import invalidate_order_summaries
 from apps.orders.models import Order, OrderItem
+from apps.products.cache import invalidate_product_lists
 from apps.products.models import Product
-from .client import TrendyolClient
+from .client import TrendyolClient, ms_to_datetime
 
 logger = logging.getLogger(__name__)
 
 
 logger = logging.getLogger(__name__)
 
+# Product page patterns used by web enrichment (matched on raw bytes)
+_OG_IMAGE_RE = re.compile(rb'property="og:image"\s+content="([^"]+)"')
+_BRAND_JSON_RE = re.compile(rb'"brand":{"@type":"Brand","name":"([^"]+)"')
+_BRAND_META_RE = re.compile(rb'property="product:brand"\s+content="([^"]+)"')
+
+# Order columns written by order sync
+ORDER_SYNC_FIELDS = [
+    'seller_account', 'trendyol_order_id', 'order_date', 'status',
+    'cargo_company', 'cargo_tracking_number', 'cargo_provider_name',
+    'shipment_package_id', 'shipped_at', 'delivered_at', 'invoice_number',
+    'total_price', 'total_discount', 'raw_data', 'payload_hash',
+    'synced_at', 'updated_at',
+]
+
+# OrderItem columns written by order sync
+ORDER_ITEM_SYNC_FIELDS = [
+    'barcode', 'product_code', 'product_name', 'product_size', 'product_color',
+    'quantity', 'unit_price', 'original_price', 'discount_amount',
+    'commission_rate', 'commission_amount', 'cargo_cost', 'platform_service_fee',
+    'merchant_sku', 'raw_data',
+]
+
+# Order line keys still read after sync when full payloads aren't stored
+# (product linking and ID recovery)
+RAW_LINE_KEYS = ('contentId', 'productCode', 'vatBase')
+
+_ZERO = Decimal('0')
+
+
+def _to_decimal(value) -> Decimal:
+    """Convert an API number to Decimal (floats go through str to keep their repr)."""
+    if not value:
+        return _ZERO
+    if isinstance(value, int):
+        return Decimal(value)
+    return Decimal(str(value))
+
 
 class ProductSyncService:
     """
     Service for synchronizing products from Trendyol.
     """
     
-    def __init__(self, seller_account: SellerAccount):
+    # Max concurrent page fetches during web enrichment
+    ENRICH_CONCURRENCY = 32
+    # Meta tags live in <head>; no need to download the whole page
+    ENRICH_READ_BYTES = 32 * 1024
+    # Threads for CloudScraper retries of pages the async fetch couldn't get
+    ENRICH_FALLBACK_WORKERS = 16
+    
+    def __init__(self, seller_account: SellerAccount, client: Optional[TrendyolClient] = None):
+        """
+        Args:
+            seller_account: Loaded seller account (used as-is, not refetched)
+            client: Optional existing client to share its session/credentials
+        """
         self.seller_account = seller_account
-        self.client = TrendyolClient(
+        self.client = client or TrendyolClient(
             seller_id=seller_account.seller_id,
-            api_key=seller_account.get_decrypted_api_key(),
-            api_secret=seller_account.get_decrypted_api_secret()
+            api_key=seller_account.decrypted_api_key,
+            api_secret=seller_account.decrypted_api_secret
         )
     
     def sync_products(self) -> dict:
@@ -49,21 +109,20 @@ class ProductSyncService:
         total_created = 0
         
         try:
-            # Fetch all products (pagination handled by client if implemented, else manual loop)
-            # Since client.get_products handles simple get, we might need a loop here or use a get_all_products method
-            # For now let's implement a simple loop similar to orders
-            
-            page = 0
             size = 100
             
-            while True:
-                response = self.client.get_products(page=page, size=size)
-                products = response.get('content', [])
-                
-                if not products:
-                    break
-                
-                for product_data in products:
+            # First page tells us how many pages there are
+            first_page = self.client.get_products(page=0, size=size)
+            responses = [first_page]
+            
+            total_pages = first_page.get('totalPages', 0)
+            if first_page.get('content') and total_pages > 1:
+                responses.extend(
+                    self.client.get_product_pages(range(1, total_pages), size=size)
+                )
+            
+            for response in responses:
+                for product_data in response.get('content', []):
                     total_fetched += 1
                     _, created = self._process_product(product_data)
                     
@@ -71,14 +130,10 @@ class ProductSyncService:
                         total_created += 1
                     else:
                         total_updated += 1
-                
-                # Check for next page
-                total_pages = response.get('totalPages', 0)
-                if page >= total_pages - 1:
-                    break
-                    
-                page += 1
-                
+            
+            if total_fetched:
+                invalidate_product_lists(self.seller_account.user_id)
+
             logger.info(
                 f'Product sync completed for {self.seller_account}: '
                 f'{total_fetched} fetched, {total_created} created, {total_updated} updated'
@@ -107,6 +162,17 @@ class ProductSyncService:
         images = product_data.get('images', [])
         image_url = images[0].get('url', '') if images else ''
         
+        # Attributes come as a list of {attributeName, attributeValue}; older
+        # payloads used a plain dict. Build one lowercase lookup for both.
+        attributes = product_data.get('attributes') or []
+        if isinstance(attributes, dict):
+            attr_map = {str(k).lower(): v for k, v in attributes.items()}
+        else:
+            attr_map = {
+                attr.get('attributeName', '').lower(): attr.get('attributeValue', '')
+                for attr in attributes
+            }
+        
         defaults = {
             'trendyol_product_id': str(product_data.get('id', '')),
             'title': product_data.get('title', ''),
@@ -114,30 +180,17 @@ class ProductSyncService:
             'category': product_data.get('category', {}).get('name', ''),
             'category_id': str(product_data.get('category', {}).get('id', '')),
             'image_url': image_url,
-            'color': product_data.get('attributes', {}).get('color', ''), # Often unstandardized
-            'size': product_data.get('attributes', {}).get('size', ''),   # Often unstandardized
+            'color': attr_map.get('renk') or attr_map.get('color', ''), # Often unstandardized
+            'size': attr_map.get('beden') or attr_map.get('size', ''),  # Often unstandardized
             # Try to populate fields if available in attributes list structure
             'stock': product_data.get('quantity', 0),
             'product_code': product_data.get('productCode', ''),
-            'desi': Decimal(str(product_data.get('dimensionalWeight', 0))),
-            'sale_price': Decimal(str(product_data.get('salePrice', 0))),
-            'list_price': Decimal(str(product_data.get('listPrice', 0))),
-            'vat_rate': Decimal(str(product_data.get('vatRate', 0))),
+            'desi': _to_decimal(product_data.get('dimensionalWeight', 0)),
+            'sale_price': _to_decimal(product_data.get('salePrice', 0)),
+            'list_price': _to_decimal(product_data.get('listPrice', 0)),
+            'vat_rate': _to_decimal(product_data.get('vatRate', 0)),
         }
         
-        # Helper to find attribute value
-        def get_attr_value(attrs, name):
-            for attr in attrs:
-                if attr.get('attributeName', '').lower() == name.lower():
-                    return attr.get('attributeValue', '')
-            return ''
-            
-        # Parse attributes list if 'attributes' is a list
-        attributes = product_data.get('attributes', [])
-        if isinstance(attributes, list):
-            defaults['color'] = get_attr_value(attributes, 'Renk')
-            defaults['size'] = get_attr_value(attributes, 'Beden')
-        
         # Update or create
         product, created = Product.objects.update_or_create(
             seller_account=self.seller_account,
@@ -165,21 +218,13 @@ class ProductSyncService:
         Fallback method to enrich product details from public web.
         Used when API permissions are restricted.
         """
-        import requests
-        import re
-        import os
         try:
             import cloudscraper
         except ImportError:
             cloudscraper = None
         
-        # Debug logging
-        def log_debug(msg):
-            try:
-                with open('debug_enrich.log', 'a') as f:
-                    f.write(f"{datetime.now()}: {msg}\n")
-            except:
-                pass
+        # Debug logging (configurable via Django LOGGING)
+        log_debug = logger.debug
 
         log_debug("Starting enrichment process with CloudScraper...")
         
@@ -194,28 +239,38 @@ class ProductSyncService:
         products_missing_id = Product.objects.filter(
              seller_account=self.seller_account,
              trendyol_product_id=''
+        ).only('id', 'trendyol_product_id').prefetch_related(
+             Prefetch(
+                  'order_items',
+                  queryset=OrderItem.objects.only('id', 'product_id', 'raw_data').order_by('order_id', 'id'),
+                  to_attr='prefetched_order_items'
+             )
         )
-        count_recovered = 0
+        recovered = []
         for p in products_missing_id:
-             item = p.order_items.first()
+             item = p.prefetched_order_items[0] if p.prefetched_order_items else None
              if item and item.raw_data:
                   content_id = str(item.raw_data.get('contentId', '') or item.raw_data.get('productCode', ''))
                   if content_id:
                        p.trendyol_product_id = content_id
-                       p.save(update_fields=['trendyol_product_id'])
-                       count_recovered += 1
+                       p.updated_at = timezone.now()
+                       recovered.append(p)
+        
+        Product.objects.bulk_update(recovered, ['trendyol_product_id', 'updated_at'], batch_size=1000)
+        count_recovered = len(recovered)
+        if count_recovered:
+            invalidate_product_lists(self.seller_account.user_id)
         
         log_debug(f"Recovered IDs for {count_recovered} products")
 
-        products = Product.objects.filter(
-            seller_account=self.seller_account
-        ) 
-        
         # Filter for products missing essential info
-        target_products = []
-        for p in products:
-            if not p.image_url or not p.brand or p.brand == '---':
-                target_products.append(p)
+        target_products = list(
+            Product.objects.filter(
+                seller_account=self.seller_account
+            ).filter(
+                Q(image_url='') | Q(brand='') | Q(brand='---')
+            ).only('id', 'barcode', 'image_url', 'brand', 'trendyol_product_id')
+        )
                 
         if not target_products:
             log_debug("No target products found for enrichment.")
@@ -224,84 +279,176 @@ class ProductSyncService:
         logger.info(f"Attempting to enrich {len(target_products)} products from public web using CloudScraper...")
         log_debug(f"Targeting {len(target_products)} products")
         
-        count = 0
+        targets = target_products[:limit]
         
-        for product in target_products[:limit]:
+        # Probe once with CloudScraper so the concurrent fetches can reuse
+        # its Cloudflare clearance cookies and user agent
+        try:
+            scraper.get('https://www.trendyol.com/', timeout=10)
+        except Exception as e:
+            log_debug(f"CloudScraper probe failed: {e}")
+        
+        pages = asyncio.run(self._fetch_product_pages(
+            targets,
+            cookies=scraper.cookies.get_dict(),
+            headers={'User-Agent': scraper.headers.get('User-Agent', '')},
+            log_debug=log_debug
+        ))
+        
+        # Retry misses (e.g. Cloudflare challenges) through CloudScraper in threads
+        missing = [product for product in targets if pages.get(product.pk) is None]
+        if missing:
+            with ThreadPoolExecutor(max_workers=self.ENRICH_FALLBACK_WORKERS) as executor:
+                results = executor.map(
+                    lambda product: self._scrape_product_page(scraper, product, log_debug),
+                    missing
+                )
+                for product, content in zip(missing, results):
+                    pages[product.pk] = content
+        
+        enriched = []
+        
+        for product in targets:
             try:
-                response = None
+                content = pages.get(product.pk)
+                if content is None:
+                    log_debug(f"Failed to get 200 OK for {product.barcode}")
+                    continue
                 
-                # Strategy 1: Direct ID URL
-                if product.trendyol_product_id:
-                    url = f"https://www.trendyol.com/p-{product.trendyol_product_id}"
-                    try:
-                        resp = scraper.get(url, timeout=10)
-                        if resp.status_code == 200:
-                            response = resp
-                    except Exception as e:
-                        log_debug(f"ID fetch failed for {product.barcode}: {e}")
+                updated = False
                 
-                # Strategy 2: Barcode Search URL (Fallback)
-                if not response:
-                    url = f"https://www.trendyol.com/sr?q={product.barcode}"
-                    try:
-                        resp = scraper.get(url, timeout=10)
-                        if resp.status_code == 200:
-                            response = resp
-                    except Exception as e:
-                        log_debug(f"Barcode fetch failed for {product.barcode}: {e}")
-
-                if response and response.status_code == 200:
-                    html = response.text
-                    updated = False
+                # 1. Try OG:Image
+                if not product.image_url:
+                    img_match = _OG_IMAGE_RE.search(content)
+                    if img_match:
+                        img_url = img_match.group(1).decode('utf-8', 'replace')
+                        if 'ty-passport' not in img_url:
+                            product.image_url = img_url
+                            updated = True
+                
+                # 2. Try Brand from JSON-LD or meta or Title
+                if not product.brand or product.brand == '---':
+                    brand_match = _BRAND_JSON_RE.search(content)
+                    if not brand_match:
+                        brand_match = _BRAND_META_RE.search(content)
                     
-                    # 1. Try OG:Image
-                    if not product.image_url:
-                        img_match = re.search(r'property="og:image"\s+content="([^"]+)"', html)
-                        if img_match:
-                            img_url = img_match.group(1)
-                            if 'ty-passport' not in img_url:
-                                product.image_url = img_url
-                                updated = True
-                            
-                    # 2. Try Brand from JSON-LD or meta or Title
-                    if not product.brand or product.brand == '---':
-                         brand_match = re.search(r'"brand":{"@type":"Brand","name":"([^"]+)"', html)
-                         if not brand_match:
-                             brand_match = re.search(r'property="product:brand"\s+content="([^"]+)"', html)
-                         
-                         if brand_match:
-                             product.brand = brand_match.group(1)
-                             updated = True
-                             
-                    if updated:
-                        product.save(update_fields=['image_url', 'brand'])
-                        count += 1
-                        log_debug(f"Enriched {product.barcode}")
-                    else:
-                        log_debug(f"No details found in HTML for {product.barcode}")
+                    if brand_match:
+                        product.brand = brand_match.group(1).decode('utf-8', 'replace')
+                        updated = True
+                
+                if updated:
+                    product.updated_at = timezone.now()
+                    enriched.append(product)
+                    log_debug(f"Enriched {product.barcode}")
                 else:
-                    log_debug(f"Failed to get 200 OK for {product.barcode} (Status: {getattr(response, 'status_code', 'N/A')})")
-                        
+                    log_debug(f"No details found in HTML for {product.barcode}")
+                    
             except Exception as e:
                 logger.warning(f"Failed to enrich product {product.barcode}: {e}")
                 log_debug(f"Exception for {product.barcode}: {e}")
                 continue
-                
+        
+        Product.objects.bulk_update(enriched, ['image_url', 'brand', 'updated_at'], batch_size=500)
+        count = len(enriched)
+        if count:
+            invalidate_product_lists(self.seller_account.user_id)
+        
         log_debug(f"Finished enrichment. Total enriched: {count}")
         return count
 
+    async def _fetch_product_pages(self, products, cookies, headers, log_debug) -> dict:
+        """
+        Fetch public product pages concurrently.
+        
+        Returns:
+            Dict mapping product pk to raw page bytes (None if not fetched)
+        """
+        semaphore = asyncio.Semaphore(self.ENRICH_CONCURRENCY)
+        async with aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit_per_host=8),
+            timeout=aiohttp.ClientTimeout(total=10),
+            cookies=cookies,
+            headers=headers,
+        ) as session:
+            results = await asyncio.gather(*(
+                self._fetch_product_page(session, semaphore, product, log_debug)
+                for product in products
+            ))
+        return {product.pk: content for product, content in zip(products, results)}
+    
+    async def _read_page_head(self, resp) -> bytes:
+        """Read the first ENRICH_READ_BYTES of a response, dropping the rest."""
+        content = bytearray()
+        async for chunk in resp.content.iter_chunked(8192):
+            content += chunk
+            if len(content) >= self.ENRICH_READ_BYTES:
+                break
+        return bytes(content[:self.ENRICH_READ_BYTES])
+    
+    def _product_page_urls(self, product) -> List[str]:
+        """Candidate public page URLs for a product, best first."""
+        urls = []
+        # Strategy 1: Direct ID URL
+        if product.trendyol_product_id:
+            urls.append(f"https://www.trendyol.com/p-{product.trendyol_product_id}")
+        # Strategy 2: Barcode Search URL (Fallback)
+        urls.append(f"https://www.trendyol.com/sr?q={product.barcode}")
+        return urls
+    
+    def _scrape_product_page(self, scraper, product, log_debug) -> Optional[bytes]:
+        """Fetch a product page head through CloudScraper (runs in a worker thread)."""
+        for url in self._product_page_urls(product):
+            try:
+                response = scraper.get(url, timeout=10, stream=True)
+                try:
+                    if response.status_code != 200:
+                        continue
+                    content = bytearray()
+                    for chunk in response.iter_content(8192):
+                        content += chunk
+                        if len(content) >= self.ENRICH_READ_BYTES:
+                            break
+                    return bytes(content[:self.ENRICH_READ_BYTES])
+                finally:
+                    response.close()
+            except Exception as e:
+                log_debug(f"CloudScraper fetch failed for {product.barcode} ({url}): {e}")
+        return None
+    
+    async def _fetch_product_page(self, session, semaphore, product, log_debug) -> Optional[bytes]:
+        """Fetch a product page by Trendyol ID, falling back to barcode search."""
+        async with semaphore:
+            for url in self._product_page_urls(product):
+                try:
+                    async with session.get(url) as resp:
+                        if resp.status == 200:
+                            return await self._read_page_head(resp)
+                except Exception as e:
+                    log_debug(f"Fetch failed for {product.barcode} ({url}): {e}")
+        return None
+
 
 class OrderSyncService:
     """
     Service for synchronizing orders from Trendyol.
     """
     
-    def __init__(self, seller_account: SellerAccount):
+    # Orders written per database transaction
+    BATCH_SIZE = 1000
+    # Rows per bulk INSERT/UPDATE statement
+    BULK_BATCH_SIZE = 500
+    
+    def __init__(self, seller_account: SellerAccount, client: Optional[TrendyolClient] = None):
+        """
+        Args:
+            seller_account: Loaded seller account (used as-is, not refetched)
+            client: Optional existing client to share its session/credentials
+        """
         self.seller_account = seller_account
-        self.client = TrendyolClient(
+        self.client = client or TrendyolClient(
             seller_id=seller_account.seller_id,
-            api_key=seller_account.get_decrypted_api_key(),
-            api_secret=seller_account.get_decrypted_api_secret()
+            api_key=seller_account.decrypted_api_key,
+            api_secret=seller_account.decrypted_api_secret
         )
     
     def sync_orders(
@@ -309,17 +456,20 @@ class OrderSyncService:
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
         sync_type: str = 'incremental'
-    ) -> Tuple[int, int, int]:
+    ) -> Tuple[int, int, int, int]:
         """
         Synchronize orders from Trendyol.
         
+        Malformed orders are logged and skipped; their numbers are stored in
+        the sync log's error_details.
+        
         Args:
             start_date: Start of date range (for full sync)
             end_date: End of date range
             sync_type: 'full' or 'incremental'
             
         Returns:
-            Tuple of (fetched, created, updated)
+            Tuple of (fetched, created, updated, skipped)
         """
         # Determine date range
         if sync_type == 'incremental' and self.seller_account.last_sync_order_date:
@@ -343,24 +493,38 @@ class OrderSyncService:
         created = 0
         updated = 0
         items_processed = 0
-        last_order_date = None
+        skipped_orders = []
+        max_order_date_ms = 0
         
         try:
-            for order_data in self.client.get_all_orders(start_date, end_date):
-                fetched += 1
-                
-                order, was_created, item_count = self._process_order(order_data)
+            orders_iter = self.client.get_all_orders(start_date, end_date)
+            
+            while True:
+                # Fetch the batch before opening the transaction so API
+                # round-trips don't hold it open
+                batch = list(islice(orders_iter, self.BATCH_SIZE))
+                if not batch:
+                    break
                 
-                if was_created:
-                    created += 1
-                else:
-                    updated += 1
+                with transaction.atomic():
+                    batch_created, batch_items, batch_skipped = self._process_batch(batch)
                 
-                items_processed += item_count
+                fetched += len(batch)
+                created += batch_created
+                updated += len(batch) - batch_created - len(batch_skipped)
+                items_processed += batch_items
+                skipped_orders.extend(batch_skipped)
                 
-                if order.order_date:
-                    if not last_order_date or order.order_date > last_order_date:
-                        last_order_date = order.order_date
+                # Skipped orders are left out; their orderDate may be the malformed field
+                max_order_date_ms = max(
+                    max_order_date_ms,
+                    max((
+                        order_data.get('orderDate') or 0 for order_data in batch
+                        if str(order_data.get('orderNumber', '')) not in batch_skipped
+                    ), default=0)
+                )
+            
+            last_order_date = ms_to_datetime(max_order_date_ms) if max_order_date_ms else None
             
             # Update seller account
             self.seller_account.mark_sync_completed(
@@ -368,17 +532,22 @@ class OrderSyncService:
                 last_order_date=last_order_date
             )
             
+            if created or updated:
+                invalidate_order_summaries(self.seller_account.user_id)
+            
             # Update sync log
             sync_log.mark_completed(
                 orders_fetched=fetched,
                 orders_created=created,
                 orders_updated=updated,
-                items_processed=items_processed
+                items_processed=items_processed,
+                error_details={'skipped_orders': skipped_orders[:100]} if skipped_orders else None
             )
             
             logger.info(
                 f'Sync completed for {self.seller_account}: '
-                f'{fetched} fetched, {created} created, {updated} updated'
+                f'{fetched} fetched, {created} created, {updated} updated, '
+                f'{len(skipped_orders)} skipped'
             )
             
         except Exception as e:
@@ -390,119 +559,190 @@ class OrderSyncService:
             
             raise
         
-        return fetched, created, updated
+        return fetched, created, updated, len(skipped_orders)
     
-    @transaction.atomic
-    def _process_order(self, order_data: dict) -> Tuple[Order, bool, int]:
+    def _process_batch(self, batch: List[dict]) -> Tuple[int, int, List[str]]:
         """
-        Process a single order from Trendyol API.
+        Upsert a batch of orders and their items with bulk queries.
+        
+        Unchanged orders (same payload hash as stored) are skipped entirely.
+        An order whose payload cannot be converted is logged and left out of
+        the writes, so it does not abort the rest of the batch.
         
         Returns:
-            Tuple of (Order, was_created, item_count)
+            Tuple of (orders_created, items_processed, skipped order numbers)
         """
-        order_number = str(order_data.get('orderNumber', ''))
+        # Last occurrence wins if pagination returned an order twice
+        orders_by_number = {
+            str(order_data.get('orderNumber', '')): order_data
+            for order_data in batch
+        }
         
-        # Parse order date
-        order_date_ms = order_data.get('orderDate', 0)
-        order_date = datetime.fromtimestamp(order_date_ms / 1000, tz=dt_timezone.utc)
+        existing_orders = Order.objects.only(
+            'id', 'trendyol_order_number', 'shipped_at', 'delivered_at', 'payload_hash'
+        ).in_bulk(list(orders_by_number), field_name='trendyol_order_number')
         
-        # Get or create order
-        order, created = Order.objects.update_or_create(
+        changed = []
+        changed_existing_ids = []
+        skipped = []
+        for order_number, order_data in orders_by_number.items():
+            existing = existing_orders.get(order_number)
+            try:
+                payload_hash = self._get_payload_hash(order_data)
+                if existing and existing.payload_hash == payload_hash:
+                    continue
+                # Items are built up front so a bad line skips the whole order
+                order = self._build_order(order_number, order_data, payload_hash, existing)
+                order_items = [
+                    self._build_order_item(order, line_data)
+                    for line_data in order_data.get('lines', [])
+                ]
+            except Exception as e:
+                logger.warning(f'Skipping malformed order {order_number} for {self.seller_account}: {e}')
+                skipped.append(order_number)
+                continue
+            if existing:
+                changed_existing_ids.append(existing.pk)
+            changed.append((order, order_items))
+        
+        if not changed:
+            return 0, 0, skipped
+        
+        # Single INSERT ... ON CONFLICT DO UPDATE; sets pk on every order
+        Order.objects.bulk_create(
+            [order for order, _ in changed],
+            batch_size=self.BULK_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['trendyol_order_number'],
+            update_fields=ORDER_SYNC_FIELDS,
+        )
+        
+        # Map existing items of updated orders to their ids
+        existing_item_ids = {
+            (order_id, line_id): item_id
+            for order_id, line_id, item_id in OrderItem.objects.filter(
+                order_id__in=changed_existing_ids
+            ).values_list('order_id', 'trendyol_line_id', 'id')
+        }
+        
+        # Items were built before their order had a pk; set order_id now
+        items = []
+        for order, order_items in changed:
+            for item in order_items:
+                item.order = order
+            items.extend(order_items)
+        
+        # Resolve products before writing so product_id goes in the same statements
+        OrderItem.link_products_bulk(items, save=False, batch_size=self.BULK_BATCH_SIZE)
+        
+        items_to_create = []
+        items_to_update = []
+        for item in items:
+            item.pk = existing_item_ids.get((item.order.pk, item.trendyol_line_id))
+            if item.pk:
+                items_to_update.append(item)
+            else:
+                items_to_create.append(item)
+        
+        OrderItem.objects.bulk_create(items_to_create, batch_size=self.BULK_BATCH_SIZE)
+        OrderItem.objects.update_from_values(
+            items_to_update, ORDER_ITEM_SYNC_FIELDS + ['product'],
+            batch_size=self.BULK_BATCH_SIZE
+        )
+        
+        created = len(changed) - len(changed_existing_ids)
+        return created, len(items_to_create) + len(items_to_update), skipped
+    
+    def _get_payload_hash(self, order_data: dict) -> str:
+        """Hash an order payload for change detection."""
+        return hashlib.blake2b(
+            orjson.dumps(order_data, option=orjson.OPT_SORT_KEYS),
+            digest_size=16
+        ).hexdigest()
+    
+    def _build_order(
+        self,
+        order_number: str,
+        order_data: dict,
+        payload_hash: str,
+        existing: Optional[Order] = None
+    ) -> Order:
+        """Build an unsaved Order from Trendyol API data."""
+        order = Order(
+            seller_account=self.seller_account,
             trendyol_order_number=order_number,
-            defaults={
-                'seller_account': self.seller_account,
-                'trendyol_order_id': str(order_data.get('id', '')),
-                'order_date': order_date,
-                'status': order_data.get('status', 'Created'),
-                'cargo_company': order_data.get('cargoProviderName', ''),
-                'cargo_tracking_number': order_data.get('cargoTrackingNumber', ''),
-                'cargo_provider_name': order_data.get('cargoProviderName', ''),
-                'shipment_package_id': str(order_data.get('shipmentPackageId', '')),
-                'invoice_number': order_data.get('invoiceNumber', ''),
-                'total_price': Decimal(str(order_data.get('totalPrice', 0))),
-                'total_discount': Decimal(str(order_data.get('totalDiscount', 0))),
-                'raw_data': order_data,
-            }
+            trendyol_order_id=str(order_data.get('id', '')),
+            order_date=ms_to_datetime(order_data.get('orderDate', 0)),
+            status=order_data.get('status', 'Created'),
+            cargo_company=order_data.get('cargoProviderName', ''),
+            cargo_tracking_number=order_data.get('cargoTrackingNumber', ''),
+            cargo_provider_name=order_data.get('cargoProviderName', ''),
+            shipment_package_id=str(order_data.get('shipmentPackageId', '')),
+            invoice_number=order_data.get('invoiceNumber', ''),
+            total_price=_to_decimal(order_data.get('totalPrice', 0)),
+            total_discount=_to_decimal(order_data.get('totalDiscount', 0)),
+            raw_data=order_data if settings.TRENDYOL_STORE_RAW else {},
+            payload_hash=payload_hash,
         )
         
-        # Process shipment dates
+        # Process shipment dates, keeping known values if absent
+        if existing:
+            order.shipped_at = existing.shipped_at
+            order.delivered_at = existing.delivered_at
         if order_data.get('shipmentDate'):
-            order.shipped_at = datetime.fromtimestamp(
-                order_data['shipmentDate'] / 1000, tz=dt_timezone.utc
-            )
+            order.shipped_at = ms_to_datetime(order_data['shipmentDate'])
         if order_data.get('deliveryDate'):
-            order.delivered_at = datetime.fromtimestamp(
-                order_data['deliveryDate'] / 1000, tz=dt_timezone.utc
-            )
-        order.save()
-        
-        # Process order items
-        item_count = 0
-        lines = order_data.get('lines', [])
-        
-        for line_data in lines:
-            self._process_order_item(order, line_data)
-            item_count += 1
+            order.delivered_at = ms_to_datetime(order_data['deliveryDate'])
         
-        return order, created, item_count
+        return order
     
-    def _process_order_item(self, order: Order, line_data: dict) -> OrderItem:
-        """Process a single order item."""
-        # DEBUG: Log raw data
-        try:
-            with open('debug_line_data.json', 'a') as f:
-                import json
-                f.write(json.dumps(line_data, default=str) + "\n---\n")
-        except:
-            pass
-
+    def _build_order_item(self, order: Order, line_data: dict) -> OrderItem:
+        """Build an unsaved OrderItem from a Trendyol order line."""
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('Order line data: %s', orjson.dumps(line_data, default=str).decode())
+        
         line_id = str(line_data.get('id', ''))
         barcode = str(line_data.get('barcode', ''))
         
         # Calculate discount
-        original_price = Decimal(str(line_data.get('price', 0)))
-        sale_price = Decimal(str(line_data.get('salePrice', 0) or line_data.get('price', 0)))
+        original_price = _to_decimal(line_data.get('price', 0))
+        sale_price = _to_decimal(line_data.get('salePrice', 0) or line_data.get('price', 0))
         discount = original_price - sale_price
         
         # Get commission info
-        commission_rate = Decimal('0')
-        commission_amount = Decimal('0')
-        cargo_cost = Decimal('0')
-        platform_fee = Decimal('0')
+        commission_rate = _ZERO
+        commission_amount = _ZERO
+        cargo_cost = _ZERO
+        platform_fee = _ZERO
         
         # Trendyol may return these in different fields
         if 'commissionRate' in line_data:
-            commission_rate = Decimal(str(line_data['commissionRate']))
+            commission_rate = _to_decimal(line_data['commissionRate'])
         if 'tyCommission' in line_data:
-            commission_amount = Decimal(str(line_data['tyCommission']))
+            commission_amount = _to_decimal(line_data['tyCommission'])
         if 'tyShipmentCost' in line_data:
-            cargo_cost = Decimal(str(line_data['tyShipmentCost']))
+            cargo_cost = _to_decimal(line_data['tyShipmentCost'])
         if 'tyServiceFee' in line_data:
-            platform_fee = Decimal(str(line_data['tyServiceFee']))
+            platform_fee = _to_decimal(line_data['tyServiceFee'])
         
-        item, _ = OrderItem.objects.update_or_create(
+        return OrderItem(
             order=order,
             trendyol_line_id=line_id,
-            defaults={
-                'barcode': barcode,
-                'product_code': line_data.get('merchantSku', ''),
-                'product_name': line_data.get('productName', ''),
-                'product_size': line_data.get('productSize', ''),
-                'product_color': line_data.get('productColor', ''),
-                'quantity': int(line_data.get('quantity', 1)),
-                'unit_price': sale_price,
-                'original_price': original_price,
-                'discount_amount': discount,
-                'commission_rate': commission_rate,
-                'commission_amount': commission_amount,
-                'cargo_cost': cargo_cost,
-                'platform_service_fee': platform_fee,
-                'merchant_sku': line_data.get('merchantSku', ''),
-                'raw_data': line_data,
-            }
+            barcode=barcode,
+            product_code=line_data.get('merchantSku', ''),
+            product_name=line_data.get('productName', ''),
+            product_size=line_data.get('productSize', ''),
+            product_color=line_data.get('productColor', ''),
+            quantity=int(line_data.get('quantity', 1)),
+            unit_price=sale_price,
+            original_price=original_price,
+            discount_amount=discount,
+            commission_rate=commission_rate,
+            commission_amount=commission_amount,
+            cargo_cost=cargo_cost,
+            platform_service_fee=platform_fee,
+            merchant_sku=line_data.get('merchantSku', ''),
+            raw_data=line_data if settings.TRENDYOL_STORE_RAW else {
+                key: line_data[key] for key in RAW_LINE_KEYS if key in line_data
+            },
         )
-        
-        # Link to product
-        item.link_product()
-        
-        return item
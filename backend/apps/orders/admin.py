@@ -3,6 +3,7 @@ Orders App - Admin Configuration
 """
 
 from django.contrib import admin
+from django.db.models import Count
 from .models import Order, OrderItem
 
 
@@ -13,6 +14,9 @@ class OrderItemInline(admin.TabularInline):
                        'unit_price', 'discount_amount', 'commission_rate', 'commission_amount',
                        'cargo_cost', 'platform_service_fee', 'item_status']
     can_delete = False
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('order', 'product')
 
 
 @admin.register(Order)
@@ -27,9 +31,15 @@ class OrderAdmin(admin.ModelAdmin):
                        'synced_at', 'created_at', 'updated_at']
     inlines = [OrderItemInline]
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'seller_account'
+        ).annotate(items_count=Count('items'))
+    
     def item_count(self, obj):
-        return obj.items.count()
+        return obj.items_count
     item_count.short_description = 'Kalem Sayısı'
+    item_count.admin_order_field = 'items_count'
 
 
 @admin.register(OrderItem)
@@ -42,3 +52,6 @@ class OrderItemAdmin(admin.ModelAdmin):
                        'product_name', 'quantity', 'unit_price', 'discount_amount',
                        'commission_rate', 'commission_amount', 'cargo_cost',
                        'platform_service_fee', 'item_status']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('order__seller_account')
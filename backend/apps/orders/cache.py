@@ -0,0 +1,30 @@
+"""
+Orders App - Cache helpers
+
+Per-user version stamps for cached order summaries. Bumping the version
+makes every cached summary of that user stale without tracking their keys.
+"""
+
+from django.core.cache import cache
+
+# Cached summary lifetime (seconds)
+ORDER_SUMMARY_CACHE_TIMEOUT = 60
+
+
+def _version_key(user_id: int) -> str:
+    return f'order_summary_version:{user_id}'
+
+
+def get_order_summary_cache_key(user_id: int, *parts) -> str:
+    """Build a summary cache key for the user's current data version."""
+    version = cache.get_or_set(_version_key(user_id), 1, timeout=None)
+    return ':'.join(['order_summary', str(user_id), str(version), *(str(part) for part in parts)])
+
+
+def invalidate_order_summaries(user_id: int):
+    """Mark all cached summaries of a user stale (e.g. after an order sync)."""
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        # No version stored yet; nothing cached under it
+        pass
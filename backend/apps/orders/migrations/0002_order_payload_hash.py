@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-16 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='payload_hash',
+            field=models.CharField(blank=True, help_text='Değişiklik tespiti için ham verinin özeti', max_length=64, verbose_name='Veri Özeti'),
+        ),
+    ]
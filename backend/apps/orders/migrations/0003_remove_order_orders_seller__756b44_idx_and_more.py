@@ -0,0 +1,29 @@
+# Generated by Django 5.1.15 on 2026-10-16 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_order_payload_hash'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='order',
+            name='orders_seller__756b44_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='order',
+            name='orders_trendyo_813145_idx',
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['seller_account', '-order_date'], name='orders_seller_date_desc'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['seller_account', 'order_date', 'status'], name='orders_summary_cov'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.15 on 2026-10-16 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_remove_order_orders_seller__756b44_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='is_revenue_order',
+            field=models.GeneratedField(db_persist=True, expression=models.Q(('status__in', ['Created', 'Picking', 'Invoiced', 'Shipped', 'Delivered'])), output_field=models.BooleanField(), verbose_name='Gelir Siparişi'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='is_completed',
+            field=models.GeneratedField(db_persist=True, expression=models.Q(('status__in', ['Delivered', 'Cancelled', 'Returned', 'UnDeliveredAndReturned'])), output_field=models.BooleanField(), verbose_name='Tamamlandı'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('is_revenue_order', True)), fields=['seller_account', 'is_revenue_order'], name='orders_seller_revenue'),
+        ),
+    ]
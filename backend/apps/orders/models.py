@@ -4,7 +4,10 @@ Orders App - Models
 Order and order item models for Trendyol orders.
 """
 
-from django.db import models
+from collections import defaultdict
+
+from django.db import connections, models, transaction
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from core.mixins import TimestampMixin
@@ -29,6 +32,9 @@ class Order(TimestampMixin, models.Model):
         ('UnDeliveredAndReturned', 'Teslim Edilemedi ve İade'),
     ]
     
+    REVENUE_STATUSES = ['Created', 'Picking', 'Invoiced', 'Shipped', 'Delivered']
+    COMPLETED_STATUSES = ['Delivered', 'Cancelled', 'Returned', 'UnDeliveredAndReturned']
+    
     seller_account = models.ForeignKey(
         'sellers.SellerAccount',
         on_delete=models.CASCADE,
@@ -61,6 +67,20 @@ class Order(TimestampMixin, models.Model):
         db_index=True
     )
     
+    # Derived from status by the database (stored, so they can be filtered and indexed)
+    is_revenue_order = models.GeneratedField(
+        expression=models.Q(status__in=REVENUE_STATUSES),
+        output_field=models.BooleanField(),
+        db_persist=True,
+        verbose_name=_('Gelir Siparişi')
+    )
+    is_completed = models.GeneratedField(
+        expression=models.Q(status__in=COMPLETED_STATUSES),
+        output_field=models.BooleanField(),
+        db_persist=True,
+        verbose_name=_('Tamamlandı')
+    )
+    
     # Customer info (hashed/anonymized for privacy)
     customer_id = models.CharField(
         _('Müşteri ID'),
@@ -129,6 +149,12 @@ class Order(TimestampMixin, models.Model):
         default=dict,
         blank=True
     )
+    payload_hash = models.CharField(
+        _('Veri Özeti'),
+        max_length=64,
+        blank=True,
+        help_text=_('Değişiklik tespiti için ham verinin özeti')
+    )
     
     # Sync tracking
     synced_at = models.DateTimeField(
@@ -148,9 +174,17 @@ class Order(TimestampMixin, models.Model):
         verbose_name_plural = _('Siparişler')
         ordering = ['-order_date']
         indexes = [
-            models.Index(fields=['seller_account', 'order_date']),
+            # Matches the default '-order_date' ordering of list endpoints
+            models.Index(fields=['seller_account', '-order_date'], name='orders_seller_date_desc'),
             models.Index(fields=['seller_account', 'status']),
-            models.Index(fields=['trendyol_order_number']),
+            # Date-range summaries with per-status counts
+            models.Index(fields=['seller_account', 'order_date', 'status'], name='orders_summary_cov'),
+            # Revenue-only filters (cancelled/returned orders skipped by the index)
+            models.Index(
+                fields=['seller_account', 'is_revenue_order'],
+                condition=models.Q(is_revenue_order=True),
+                name='orders_seller_revenue'
+            ),
         ]
     
     def __str__(self):
@@ -158,18 +192,95 @@ class Order(TimestampMixin, models.Model):
     
     @property
     def item_count(self):
-        """Number of items in this order."""
+        """
+        Number of items in this order.
+        
+        Uses the `items_count` annotation or prefetched items when available.
+        """
+        if hasattr(self, 'items_count'):
+            return self.items_count
+        if 'items' in getattr(self, '_prefetched_objects_cache', {}):
+            return len(self.items.all())
         return self.items.count()
+
+
+class OrderItemManager(models.Manager):
+    """Manager for OrderItem with a faster bulk update path."""
     
-    @property
-    def is_completed(self):
-        """Check if order is in a final state."""
-        return self.status in ['Delivered', 'Cancelled', 'Returned', 'UnDeliveredAndReturned']
-    
-    @property
-    def is_revenue_order(self):
-        """Check if order generates revenue (not cancelled/returned)."""
-        return self.status in ['Created', 'Picking', 'Invoiced', 'Shipped', 'Delivered']
+    def update_from_values(self, objs, fields, batch_size=1000):
+        """
+        Update many rows with one UPDATE ... FROM (VALUES ...) per batch.
+        
+        Same result as bulk_update(objs, fields), without the per-field
+        CASE WHEN expressions. Falls back to bulk_update on backends other
+        than PostgreSQL and SQLite (3.33+).
+        
+        Returns:
+            Number of rows updated
+        """
+        objs = list(objs)
+        if not objs:
+            return 0
+        
+        connection = connections[self.db]
+        if not self._supports_update_from(connection):
+            return self.bulk_update(objs, fields, batch_size=batch_size)
+        
+        opts = self.model._meta
+        fields = [opts.get_field(name) for name in fields]
+        columns = [opts.pk] + fields
+        qn = connection.ops.quote_name
+        
+        def value_sql(field):
+            # VALUES params are untyped on PostgreSQL; SQLite relies on column affinity
+            if connection.vendor == 'postgresql':
+                return f'CAST(v.{qn(field.column)} AS {field.db_type(connection)})'
+            return f'v.{qn(field.column)}'
+        
+        def values_sql(rows_sql):
+            # SQLite names VALUES columns column1..N and has no column alias list
+            if connection.vendor == 'postgresql':
+                column_list = ', '.join(qn(field.column) for field in columns)
+                return f'(VALUES {rows_sql}) AS v ({column_list})'
+            column_list = ', '.join(
+                f'column{i} AS {qn(field.column)}' for i, field in enumerate(columns, 1)
+            )
+            return f'(SELECT {column_list} FROM (VALUES {rows_sql})) AS v'
+        
+        table = qn(opts.db_table)
+        set_sql = ', '.join(f'{qn(field.column)} = {value_sql(field)}' for field in fields)
+        row_sql = '(' + ', '.join(['%s'] * len(columns)) + ')'
+        
+        updated = 0
+        with transaction.atomic(using=self.db, savepoint=False), connection.cursor() as cursor:
+            for start in range(0, len(objs), batch_size):
+                batch = objs[start:start + batch_size]
+                params = []
+                for obj in batch:
+                    obj._prepare_related_fields_for_save(
+                        operation_name='update_from_values', fields=fields
+                    )
+                    params.extend(
+                        field.get_db_prep_save(getattr(obj, field.attname), connection)
+                        for field in columns
+                    )
+                cursor.execute(
+                    f'UPDATE {table} SET {set_sql} '
+                    f'FROM {values_sql(", ".join([row_sql] * len(batch)))} '
+                    f'WHERE {table}.{qn(opts.pk.column)} = {value_sql(opts.pk)}',
+                    params
+                )
+                updated += cursor.rowcount
+        return updated
+    
+    @staticmethod
+    def _supports_update_from(connection):
+        """UPDATE ... FROM is supported on PostgreSQL and SQLite 3.33+."""
+        if connection.vendor == 'postgresql':
+            return True
+        if connection.vendor == 'sqlite':
+            return connection.Database.sqlite_version_info >= (3, 33)
+        return False
 
 
 class OrderItem(models.Model):
@@ -326,6 +437,8 @@ class OrderItem(models.Model):
         blank=True
     )
     
+    objects = OrderItemManager()
+    
     class Meta:
         db_table = 'order_items'
         verbose_name = _('Sipariş Kalemi')
@@ -350,14 +463,8 @@ class OrderItem(models.Model):
         """Check if this item generates revenue."""
         return self.item_status == 'active' and self.order.is_revenue_order
     
-    def link_product(self):
-        """
-        Link this order item to a Product record.
-        Creates the product if it doesn't exist.
-        """
-        from apps.products.models import Product
-        
-        # Extract VAT from raw data
+    def _get_raw_product_info(self):
+        """Extract (content_id, vat_rate) from raw Trendyol line data."""
         vat_rate_val = self.raw_data.get('vatBase', 0)
         try:
             vat_rate = int(vat_rate_val)
@@ -365,8 +472,12 @@ class OrderItem(models.Model):
             vat_rate = 0
             
         content_id = str(self.raw_data.get('contentId', '') or self.raw_data.get('productCode', ''))
-        
-        defaults = {
+        return content_id, vat_rate
+    
+    def get_product_defaults(self):
+        """Field values for a Product created from this order item."""
+        content_id, vat_rate = self._get_raw_product_info()
+        return {
             'product_code': self.product_code,
             'title': self.product_name,
             'trendyol_product_id': content_id,
@@ -375,33 +486,132 @@ class OrderItem(models.Model):
             'sales_vat_rate': vat_rate,
             'purchase_vat_rate': vat_rate, # Default assumption
         }
+    
+    def apply_to_product(self, product):
+        """
+        Fill missing product details from this order item.
+        
+        Returns:
+            List of updated field names (product is not saved)
+        """
+        content_id, vat_rate = self._get_raw_product_info()
+        
+        updates = []
+        if not product.title:
+            product.title = self.product_name
+            updates.append('title')
+        
+        # Recover ID if missing
+        if not product.trendyol_product_id and content_id:
+            product.trendyol_product_id = content_id
+            updates.append('trendyol_product_id')
+            
+        # Update VAT if missing
+        if product.sales_vat_rate == 0 and vat_rate > 0:
+            product.sales_vat_rate = vat_rate
+            updates.append('sales_vat_rate')
+            
+        if product.purchase_vat_rate == 0 and vat_rate > 0:
+             product.purchase_vat_rate = vat_rate
+             updates.append('purchase_vat_rate')
+        
+        return updates
+    
+    @classmethod
+    def link_products_bulk(cls, items, save=True, batch_size=1000):
+        """
+        Link many order items to Product records in a fixed number of queries.
+        
+        Same rules as link_product(): missing products are created and empty
+        product details are filled from the items. Items need `order` loaded.
+        
+        Args:
+            items: Order items to link
+            save: Write item.product with one bulk_update (False for unsaved
+                  items that the caller writes afterwards)
+            batch_size: Rows per bulk statement
+        """
+        from apps.products.cache import invalidate_product_lists_for_sellers
+        from apps.products.models import Product
+        
+        items_by_key = defaultdict(list)
+        for item in items:
+            items_by_key[(item.order.seller_account_id, item.barcode)].append(item)
+        
+        if not items_by_key:
+            return
+        
+        def fetch_products(keys):
+            return {
+                (product.seller_account_id, product.barcode): product
+                for product in Product.objects.filter(
+                    seller_account_id__in={seller_id for seller_id, _ in keys},
+                    barcode__in={barcode for _, barcode in keys}
+                )
+                if (product.seller_account_id, product.barcode) in keys
+            }
+        
+        products = fetch_products(items_by_key.keys())
+        
+        new_products = []
+        updated_products = []
+        update_fields = set()
+        for key, key_items in items_by_key.items():
+            product = products.get(key)
+            if product is None:
+                new_products.append(Product(
+                    seller_account_id=key[0],
+                    barcode=key[1],
+                    **key_items[0].get_product_defaults()
+                ))
+                continue
+            
+            fields = set()
+            for item in key_items:
+                fields.update(item.apply_to_product(product))
+            if fields:
+                # bulk_update skips auto_now; keeps product caches keyed on it valid
+                product.updated_at = timezone.now()
+                updated_products.append(product)
+                update_fields.update(fields, ['updated_at'])
+        
+        if updated_products:
+            Product.objects.bulk_update(updated_products, list(update_fields), batch_size=batch_size)
+        
+        if new_products:
+            # A concurrent sync may insert the same barcode; re-read to get pks
+            Product.objects.bulk_create(new_products, batch_size=batch_size, ignore_conflicts=True)
+            products.update(fetch_products({
+                (product.seller_account_id, product.barcode) for product in new_products
+            }))
+        
+        if updated_products or new_products:
+            invalidate_product_lists_for_sellers(
+                {product.seller_account_id for product in updated_products + new_products}
+            )
+        
+        for key, key_items in items_by_key.items():
+            for item in key_items:
+                item.product = products[key]
+        
+        if save:
+            cls.objects.bulk_update(items, ['product'], batch_size=batch_size)
+    
+    def link_product(self):
+        """
+        Link this order item to a Product record.
+        Creates the product if it doesn't exist.
+        """
+        from apps.products.models import Product
         
         product, created = Product.objects.get_or_create(
             seller_account=self.order.seller_account,
             barcode=self.barcode,
-            defaults=defaults
+            defaults=self.get_product_defaults()
         )
         
         if not created:
-            updates = []
-            if not product.title:
-                product.title = self.product_name
-                updates.append('title')
-            
-            # Recover ID if missing
-            if not product.trendyol_product_id and content_id:
-                product.trendyol_product_id = content_id
-                updates.append('trendyol_product_id')
-                
-            # Update VAT if missing
-            if product.sales_vat_rate == 0 and vat_rate > 0:
-                product.sales_vat_rate = vat_rate
-                updates.append('sales_vat_rate')
-                
-            if product.purchase_vat_rate == 0 and vat_rate > 0:
-                 product.purchase_vat_rate = vat_rate
-                 updates.append('purchase_vat_rate')
-            
+            updates = self.apply_to_product(product)
             if updates:
                 product.save(update_fields=updates)
         
@@ -2,10 +2,63 @@
 Orders App - Serializers
 """
 
+from django.db import models
 from rest_framework import serializers
 from .models import Order, OrderItem
 
 
+class OrderItemListSerializer(serializers.ListSerializer):
+    """
+    Fast list representation for order items.
+    
+    Builds each dict straight from model attributes instead of binding and
+    resolving every field per instance. Output matches OrderItemSerializer.
+    """
+    
+    DECIMAL_FIELDS = (
+        'unit_price', 'original_price', 'discount_amount',
+        'commission_rate', 'commission_amount', 'cargo_cost', 'platform_service_fee',
+    )
+    
+    def to_representation(self, data):
+        items = data.all() if isinstance(data, models.manager.BaseManager) else data
+        
+        # Reuse the child's DecimalFields so formatting (quantize, str) is identical
+        decimal = {
+            name: self.child.fields[name].to_representation
+            for name in self.DECIMAL_FIELDS
+        }
+        
+        result = []
+        for item in items:
+            product = item.product
+            result.append({
+                'id': item.id,
+                'trendyol_line_id': item.trendyol_line_id,
+                'barcode': item.barcode,
+                'product_code': item.product_code,
+                'product_name': item.product_name,
+                'product_title': product.title if product else None,
+                'product_size': item.product_size,
+                'product_color': item.product_color,
+                'quantity': item.quantity,
+                'unit_price': decimal['unit_price'](item.unit_price),
+                'original_price': decimal['original_price'](item.original_price),
+                'discount_amount': decimal['discount_amount'](item.discount_amount),
+                'line_total': item.line_total,
+                'commission_rate': decimal['commission_rate'](item.commission_rate),
+                'commission_amount': decimal['commission_amount'](item.commission_amount),
+                'cargo_cost': decimal['cargo_cost'](item.cargo_cost),
+                'platform_service_fee': decimal['platform_service_fee'](item.platform_service_fee),
+                'item_status': item.item_status,
+                'return_reason': item.return_reason,
+                'is_calculated': item.is_calculated,
+                'has_cost_data': product.has_cost_data if product else False,
+                'product': item.product_id,
+            })
+        return result
+
+
 class OrderItemSerializer(serializers.ModelSerializer):
     """Serializer for order items."""
     
@@ -25,12 +78,13 @@ class OrderItemSerializer(serializers.ModelSerializer):
             'is_calculated', 'has_cost_data',
             'product'
         ]
+        list_serializer_class = OrderItemListSerializer
 
 
 class OrderSerializer(serializers.ModelSerializer):
     """Serializer for order listing."""
     
-    item_count = serializers.ReadOnlyField()
+    item_count = serializers.IntegerField(read_only=True)
     seller_name = serializers.CharField(source='seller_account.shop_name', read_only=True)
     is_revenue_order = serializers.ReadOnlyField()
     
@@ -51,7 +105,7 @@ class OrderDetailSerializer(serializers.ModelSerializer):
     """Detailed serializer for single order view."""
     
     items = OrderItemSerializer(many=True, read_only=True)
-    item_count = serializers.ReadOnlyField()
+    item_count = serializers.IntegerField(read_only=True)
     seller_name = serializers.CharField(source='seller_account.shop_name', read_only=True)
     is_revenue_order = serializers.ReadOnlyField()
     
@@ -3,13 +3,16 @@ Orders App - Views
 """
 
 from rest_framework import generics, status
+from rest_framework.pagination import CursorPagination
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Sum, Count, Q
+from django.core.cache import cache
+from django.db.models import Sum, Count, Q, Prefetch, Exists, OuterRef, Subquery
 from django.utils import timezone
-from datetime import timedelta
+from datetime import date, datetime, time, timedelta
 
+from .cache import ORDER_SUMMARY_CACHE_TIMEOUT, get_order_summary_cache_key
 from .models import Order, OrderItem
 from .serializers import (
     OrderSerializer,
@@ -18,6 +21,51 @@ from .serializers import (
     OrderSummarySerializer,
 )
 
+# Columns read by OrderItemSerializer (product title/has_cost_data are stored
+# fields, so select_related + only() makes them plain attribute reads)
+ORDER_ITEM_SERIALIZER_FIELDS = [
+    'id', 'order_id', 'trendyol_line_id', 'barcode', 'product_code',
+    'product_name', 'product_size', 'product_color',
+    'quantity', 'unit_price', 'original_price', 'discount_amount',
+    'commission_rate', 'commission_amount', 'cargo_cost', 'platform_service_fee',
+    'item_status', 'return_reason', 'is_calculated',
+    'product__id', 'product__title', 'product__has_cost_data',
+]
+
+
+def _day_bounds(start_date, end_date):
+    """
+    Convert ISO date params to a half-open [start, end) datetime range.
+    
+    Filtering order_date directly (instead of order_date__date) keeps the
+    order_date indexes usable. Days are taken in the current timezone;
+    invalid dates are ignored.
+    
+    Returns:
+        Tuple of (start_dt, end_dt), either may be None
+    """
+    def start_of(day_str, offset_days=0):
+        try:
+            day = date.fromisoformat(day_str)
+        except (TypeError, ValueError):
+            return None
+        return timezone.make_aware(datetime.combine(day + timedelta(days=offset_days), time.min))
+    
+    start_dt = start_of(start_date) if start_date else None
+    end_dt = start_of(end_date, offset_days=1) if end_date else None
+    return start_dt, end_dt
+
+
+class OrderCursorPagination(CursorPagination):
+    """
+    Keyset pagination for order lists.
+    
+    Pages seek on (order_date, id) through the seller/date index, so deep
+    pages cost the same as the first one (no OFFSET scan).
+    """
+    ordering = ('-order_date', '-id')
+    page_size = 50
+
 
 class OrderListView(generics.ListAPIView):
     """
@@ -33,12 +81,15 @@ class OrderListView(generics.ListAPIView):
     """
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = OrderCursorPagination
     
     def get_queryset(self):
         user = self.request.user
         queryset = Order.objects.filter(
             seller_account__user=user
-        ).select_related('seller_account')
+        ).select_related('seller_account').defer('raw_data').annotate(
+            items_count=Count('items')
+        )
         
         params = self.request.query_params
         
@@ -50,13 +101,11 @@ class OrderListView(generics.ListAPIView):
         if order_status:
             queryset = queryset.filter(status=order_status)
         
-        start_date = params.get('start_date')
-        if start_date:
-            queryset = queryset.filter(order_date__date__gte=start_date)
-        
-        end_date = params.get('end_date')
-        if end_date:
-            queryset = queryset.filter(order_date__date__lte=end_date)
+        start_dt, end_dt = _day_bounds(params.get('start_date'), params.get('end_date'))
+        if start_dt:
+            queryset = queryset.filter(order_date__gte=start_dt)
+        if end_dt:
+            queryset = queryset.filter(order_date__lt=end_dt)
         
         search = params.get('search')
         if search:
@@ -64,9 +113,12 @@ class OrderListView(generics.ListAPIView):
         
         barcode = params.get('barcode')
         if barcode:
-            queryset = queryset.filter(items__barcode=barcode).distinct()
+            queryset = queryset.filter(
+                Exists(OrderItem.objects.filter(order_id=OuterRef('pk'), barcode=barcode))
+            )
         
-        return queryset.order_by('-order_date')
+        # Ordering is applied by OrderCursorPagination
+        return queryset
 
 
 class OrderDetailView(generics.RetrieveAPIView):
@@ -77,9 +129,13 @@ class OrderDetailView(generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
+        # Items and their products in one JOINed query, limited to serialized columns
+        items = OrderItem.objects.select_related('product').only(*ORDER_ITEM_SERIALIZER_FIELDS)
         return Order.objects.filter(
             seller_account__user=self.request.user
-        ).prefetch_related('items', 'items__product')
+        ).select_related('seller_account').defer('raw_data').prefetch_related(
+            Prefetch('items', queryset=items)
+        )
 
 
 class OrderItemsView(generics.ListAPIView):
@@ -94,63 +150,100 @@ class OrderItemsView(generics.ListAPIView):
         return OrderItem.objects.filter(
             order_id=order_id,
             order__seller_account__user=self.request.user
-        ).select_related('product')
+        ).select_related('product').only(*ORDER_ITEM_SERIALIZER_FIELDS)
 
 
 class OrderSummaryView(APIView):
     """
     Get order summary statistics.
+    
+    Without start_date, the summary covers the last DEFAULT_WINDOW_DAYS days.
     """
     permission_classes = [IsAuthenticated]
     
+    # Bound the aggregate's working set when no start date is given
+    DEFAULT_WINDOW_DAYS = 365
+    
     def get(self, request):
         user = request.user
         params = request.query_params
         
-        queryset = Order.objects.filter(seller_account__user=user)
+        filters = {'seller_account__user': user}
         
-        # Apply filters
         seller_account = params.get('seller_account')
         if seller_account:
-            queryset = queryset.filter(seller_account_id=seller_account)
+            filters['seller_account_id'] = seller_account
         
-        start_date = params.get('start_date')
-        if start_date:
-            queryset = queryset.filter(order_date__date__gte=start_date)
+        start_dt, end_dt = _day_bounds(params.get('start_date'), params.get('end_date'))
+        if not start_dt:
+            start_dt = timezone.make_aware(datetime.combine(
+                timezone.localdate() - timedelta(days=self.DEFAULT_WINDOW_DAYS), time.min
+            ))
+        filters['order_date__gte'] = start_dt
+        if end_dt:
+            filters['order_date__lt'] = end_dt
         
-        end_date = params.get('end_date')
-        if end_date:
-            queryset = queryset.filter(order_date__date__lte=end_date)
+        # Dashboards poll this; serve repeats from cache until the next sync
+        cache_key = get_order_summary_cache_key(
+            user.id,
+            seller_account or 'all',
+            start_dt.isoformat(),
+            end_dt.isoformat() if end_dt else ''
+        )
+        data = cache.get(cache_key)
+        if data is None:
+            data = self._get_summary(filters)
+            cache.set(cache_key, data, timeout=ORDER_SUMMARY_CACHE_TIMEOUT)
+        
+        return Response({
+            'success': True,
+            'data': data
+        })
+    
+    def _get_summary(self, filters: dict) -> dict:
+        """Compute summary statistics for orders matching filters."""
+        queryset = Order.objects.filter(**filters)
+        
+        # Calculate summary, with per-status counts in the same query
+        status_aggregates = {
+            f'status_{code}': Count('id', filter=Q(status=code))
+            for code, _ in Order.STATUS_CHOICES
+        }
+        # Per-order item quantity as a correlated subquery, so it can be summed
+        # in the same aggregate without JOIN fan-out inflating other totals
+        items_qty = OrderItem.objects.filter(
+            order=OuterRef('pk')
+        ).values('order').annotate(total=Sum('quantity')).values('total')
         
-        # Calculate summary
-        summary = queryset.aggregate(
+        summary = queryset.annotate(items_qty=Subquery(items_qty)).aggregate(
             total_orders=Count('id'),
+            total_items=Sum('items_qty'),
             total_revenue=Sum('total_price'),
             total_discount=Sum('total_discount'),
+            **status_aggregates
         )
+        total_items = summary['total_items'] or 0
         
-        total_items = OrderItem.objects.filter(
-            order__in=queryset
-        ).aggregate(total=Sum('quantity'))['total'] or 0
+        by_status = {
+            code: summary[f'status_{code}']
+            for code, _ in Order.STATUS_CHOICES
+            if summary[f'status_{code}']
+        }
         
-        # Count by status
-        status_counts = queryset.values('status').annotate(
-            count=Count('id')
-        )
-        by_status = {item['status']: item['count'] for item in status_counts}
+        # Statuses outside STATUS_CHOICES (raw Trendyol values) need a group-by
+        if sum(by_status.values()) < (summary['total_orders'] or 0):
+            status_counts = queryset.values('status').annotate(
+                count=Count('id')
+            )
+            by_status = {item['status']: item['count'] for item in status_counts}
         
-        data = {
+        return {
             'total_orders': summary['total_orders'] or 0,
             'total_items': total_items,
             'total_revenue': summary['total_revenue'] or 0,
             'total_discount': summary['total_discount'] or 0,
             'by_status': by_status,
         }
-        
-        return Response({
-            'success': True,
-            'data': data
-        })
 
 
 class RecentOrdersView(generics.ListAPIView):
@@ -165,7 +258,9 @@ class RecentOrdersView(generics.ListAPIView):
         return Order.objects.filter(
             seller_account__user=self.request.user,
             order_date__gte=seven_days_ago
-        ).select_related('seller_account').order_by('-order_date')[:50]
+        ).select_related('seller_account').defer('raw_data').annotate(
+            items_count=Count('items')
+        ).order_by('-order_date')[:50]
 
 
 class OrdersByProductView(generics.ListAPIView):
@@ -178,6 +273,8 @@ class OrdersByProductView(generics.ListAPIView):
     def get_queryset(self):
         barcode = self.kwargs.get('barcode')
         return Order.objects.filter(
-            seller_account__user=self.request.user,
-            items__barcode=barcode
-        ).distinct().order_by('-order_date')[:100]
+            Exists(OrderItem.objects.filter(order_id=OuterRef('pk'), barcode=barcode)),
+            seller_account__user=self.request.user
+        ).select_related('seller_account').defer('raw_data').annotate(
+            items_count=Count('items')
+        ).order_by('-order_date')[:100]
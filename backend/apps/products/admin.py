@@ -3,7 +3,7 @@ Products App - Admin Configuration
 """
 
 from django.contrib import admin
-from .models import Product, ProductCostHistory, BulkCostUpload
+from .models import Product, ProductCostHistory, BulkCostUpload, ProductDetailUpload
 
 
 @admin.register(Product)
@@ -32,3 +32,13 @@ class BulkCostUploadAdmin(admin.ModelAdmin):
     readonly_fields = ['seller_account', 'file_name', 'file_path', 'status',
                        'total_rows', 'processed_rows', 'success_count', 'error_count',
                        'error_details', 'created_at', 'processed_at']
+
+
+@admin.register(ProductDetailUpload)
+class ProductDetailUploadAdmin(admin.ModelAdmin):
+    list_display = ['file_name', 'user', 'status', 'success_count', 'created_at']
+    list_filter = ['status', 'created_at']
+    ordering = ['-created_at']
+    readonly_fields = ['user', 'file_name', 'file_path', 'status',
+                       'total_rows', 'success_count',
+                       'error_details', 'created_at', 'processed_at']
@@ -0,0 +1,46 @@
+"""
+Products App - Cache helpers
+
+Per-user version stamps for cached product list responses. Bumping the
+version makes every cached list page of that user stale without tracking
+their keys.
+"""
+
+import hashlib
+
+from django.core.cache import cache
+
+# Cached list page lifetime (seconds); also bounds staleness for writes
+# that do not bump the version
+PRODUCT_LIST_CACHE_TIMEOUT = 60
+
+
+def _version_key(user_id: int) -> str:
+    return f'product_list_version:{user_id}'
+
+
+def get_product_list_cache_key(user_id: int, request_uri: str) -> str:
+    """Build a list cache key for the user's current data version and request URI."""
+    version = cache.get_or_set(_version_key(user_id), 1, timeout=None)
+    uri_hash = hashlib.blake2b(request_uri.encode(), digest_size=16).hexdigest()
+    return f'product_list:{user_id}:{version}:{uri_hash}'
+
+
+def invalidate_product_lists(user_id: int):
+    """Mark all cached product lists of a user stale (e.g. after a product write)."""
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        # No version stored yet; nothing cached under it
+        pass
+
+
+def invalidate_product_lists_for_sellers(seller_account_ids):
+    """Mark product lists stale for the owners of the given seller accounts."""
+    from apps.sellers.models import SellerAccount
+    
+    user_ids = SellerAccount.objects.filter(
+        pk__in=list(seller_account_ids)
+    ).values_list('user_id', flat=True).distinct()
+    for user_id in user_ids:
+        invalidate_product_lists(user_id)
@@ -0,0 +1,51 @@
+# Generated by Django 5.1.15 on 2026-10-16 11:45
+
+from django.db import migrations, models
+
+# Django compiles icontains to UPPER(column::text) LIKE UPPER(%s) on PostgreSQL,
+# so the search (title/barcode/product_code) and brand/category filter indexes
+# are built on the same UPPER() expression (PostgreSQL only)
+TRIGRAM_INDEXES = [
+    ('prod_title_trgm', 'title'),
+    ('prod_barcode_trgm', 'barcode'),
+    ('prod_code_trgm', 'product_code'),
+    ('prod_brand_trgm', 'brand'),
+    ('prod_category_trgm', 'category'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON products '
+            f'USING gin (UPPER({column}::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_product_color_product_desi_product_image_url_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['seller_account', 'is_active', 'has_cost_data', '-last_order_date'], name='prod_list_filters'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('has_cost_data', False), ('is_active', True)), fields=['seller_account', 'title'], name='prod_missing_cost'),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
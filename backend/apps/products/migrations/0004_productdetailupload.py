@@ -0,0 +1,38 @@
+# Generated by Django 5.1.15 on 2026-10-16 13:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_product_list_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductDetailUpload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Oluşturulma Tarihi')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Güncellenme Tarihi')),
+                ('file_name', models.CharField(max_length=255, verbose_name='Dosya Adı')),
+                ('file_path', models.FileField(upload_to='product_detail_uploads/%Y/%m/', verbose_name='Dosya')),
+                ('status', models.CharField(choices=[('pending', 'Beklemede'), ('processing', 'İşleniyor'), ('completed', 'Tamamlandı'), ('failed', 'Başarısız')], default='pending', max_length=20, verbose_name='Durum')),
+                ('total_rows', models.PositiveIntegerField(default=0)),
+                ('success_count', models.PositiveIntegerField(default=0)),
+                ('error_details', models.JSONField(blank=True, default=list, verbose_name='Hata Detayları')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='İşlenme Tarihi')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_detail_uploads', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Ürün Bilgisi Yüklemesi',
+                'verbose_name_plural': 'Ürün Bilgisi Yüklemeleri',
+                'db_table': 'product_detail_uploads',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
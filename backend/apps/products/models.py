@@ -4,12 +4,93 @@ Products App - Models
 Product catalog with cost tracking for profitability analysis.
 """
 
-from django.db import models
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connections, models, transaction
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from core.mixins import TimestampMixin
 from core.validators import validate_barcode, validate_positive_decimal, validate_percentage
 
+_DEC_100 = Decimal('100')
+
+
+class ProductManager(models.Manager):
+    """Manager for Product with set-based detail updates."""
+    
+    # Columns settable through apply_detail_updates
+    DETAIL_UPDATE_FIELDS = ('image_url', 'brand')
+    
+    def apply_detail_updates(self, user_id, updates_by_barcode):
+        """
+        Apply image_url/brand updates to a user's products by barcode.
+        
+        The user's seller account ids are resolved once, so the update is
+        scoped by seller_account_id without joining seller accounts. On
+        PostgreSQL the updates are COPY'd into a temp table and merged with
+        one UPDATE ... FROM; elsewhere matching products are fetched once
+        and written back with bulk_update. Fields missing from a barcode's
+        update dict are left unchanged.
+        
+        Args:
+            user_id: Owner of the products (all of their seller accounts)
+            updates_by_barcode: {barcode: {'image_url': ..., 'brand': ...}}
+        
+        Returns:
+            Barcodes of the updated products, one per product (a barcode
+            repeats when several seller accounts carry it)
+        """
+        from apps.sellers.models import SellerAccount
+        
+        if not updates_by_barcode:
+            return []
+        seller_ids = list(SellerAccount.objects.filter(user_id=user_id).values_list('id', flat=True))
+        if not seller_ids:
+            return []
+        
+        connection = connections[self.db]
+        if connection.vendor != 'postgresql':
+            return self._apply_detail_updates_orm(seller_ids, updates_by_barcode)
+        
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        
+        with transaction.atomic(using=self.db, savepoint=False), connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMP TABLE _product_detail_updates '
+                '(barcode text PRIMARY KEY, image_url text, brand text) ON COMMIT DROP'
+            )
+            with cursor.copy('COPY _product_detail_updates (barcode, image_url, brand) FROM STDIN') as copy:
+                for barcode, updates in updates_by_barcode.items():
+                    copy.write_row((barcode, updates.get('image_url'), updates.get('brand')))
+            cursor.execute(
+                f'UPDATE {table} AS p SET '
+                f'image_url = COALESCE(u.image_url, p.image_url), '
+                f'brand = COALESCE(u.brand, p.brand), '
+                f'updated_at = %s '
+                f'FROM _product_detail_updates AS u '
+                f'WHERE p.barcode = u.barcode AND p.seller_account_id = ANY(%s) '
+                f'RETURNING p.barcode',
+                [timezone.now(), seller_ids]
+            )
+            return [barcode for barcode, in cursor.fetchall()]
+    
+    def _apply_detail_updates_orm(self, seller_ids, updates_by_barcode):
+        products = list(self.filter(
+            seller_account_id__in=seller_ids,
+            barcode__in=list(updates_by_barcode)
+        ).only('id', 'barcode', *self.DETAIL_UPDATE_FIELDS, 'updated_at'))
+        
+        now = timezone.now()
+        for product in products:
+            for field, value in updates_by_barcode[product.barcode].items():
+                setattr(product, field, value)
+            product.updated_at = now
+        
+        self.bulk_update(products, [*self.DETAIL_UPDATE_FIELDS, 'updated_at'], batch_size=1000)
+        return [product.barcode for product in products]
+
 
 class Product(TimestampMixin, models.Model):
     """
@@ -19,6 +100,11 @@ class Product(TimestampMixin, models.Model):
     Product costs can be updated over time, with history tracking.
     """
     
+    # Fields written by a cost update
+    COST_UPDATE_FIELDS = ['product_cost_excl_vat', 'purchase_vat_rate', 'cost_updated_at', 'has_cost_data', 'updated_at']
+    
+    objects = ProductManager()
+    
     seller_account = models.ForeignKey(
         'sellers.SellerAccount',
         on_delete=models.CASCADE,
@@ -170,6 +256,18 @@ class Product(TimestampMixin, models.Model):
         indexes = [
             models.Index(fields=['seller_account', 'barcode']),
             models.Index(fields=['seller_account', 'product_code']),
+            # Product list filters, in the list's '-last_order_date' order
+            models.Index(
+                fields=['seller_account', 'is_active', 'has_cost_data', '-last_order_date'],
+                name='prod_list_filters'
+            ),
+            # ProductsWithoutCostView, in its title order
+            # (brand/category icontains filters use trigram indexes, migration 0003)
+            models.Index(
+                fields=['seller_account', 'title'],
+                condition=models.Q(has_cost_data=False, is_active=True),
+                name='prod_missing_cost'
+            ),
         ]
     
     def __str__(self):
@@ -180,20 +278,27 @@ class Product(TimestampMixin, models.Model):
         self.has_cost_data = self.product_cost_excl_vat is not None
         super().save(*args, **kwargs)
     
-    def update_cost(self, cost_excl_vat, vat_rate=None, track_history=True):
+    def apply_cost_update(self, cost_excl_vat, vat_rate=None, track_history=True):
         """
-        Update product cost with optional history tracking.
+        Apply a cost update in memory without saving.
+        
+        Lets bulk callers collect products and history rows and write them
+        with bulk_update/bulk_create.
         
         Args:
             cost_excl_vat: New cost excluding VAT
             vat_rate: Optional new VAT rate
-            track_history: Whether to create a history record
+            track_history: Whether to build a history record
+        
+        Returns:
+            Unsaved ProductCostHistory for the previous cost, or None
         """
         from django.utils import timezone
         
+        history = None
         if track_history and self.product_cost_excl_vat is not None:
-            # Create history record before updating
-            ProductCostHistory.objects.create(
+            # History record of the cost being replaced
+            history = ProductCostHistory(
                 product=self,
                 cost_excl_vat=self.product_cost_excl_vat,
                 vat_rate=self.purchase_vat_rate,
@@ -204,8 +309,28 @@ class Product(TimestampMixin, models.Model):
         if vat_rate is not None:
             self.purchase_vat_rate = vat_rate
         self.cost_updated_at = timezone.now()
+        self.updated_at = self.cost_updated_at
         self.has_cost_data = True
-        self.save(update_fields=['product_cost_excl_vat', 'purchase_vat_rate', 'cost_updated_at', 'has_cost_data'])
+        return history
+    
+    def update_cost(self, cost_excl_vat, vat_rate=None, track_history=True, extra_fields=None):
+        """
+        Update product cost with optional history tracking.
+        
+        Args:
+            cost_excl_vat: New cost excluding VAT
+            vat_rate: Optional new VAT rate
+            track_history: Whether to create a history record
+            extra_fields: Optional {field: value} saved in the same UPDATE
+        """
+        history = self.apply_cost_update(cost_excl_vat, vat_rate, track_history)
+        extra_fields = extra_fields or {}
+        for field, value in extra_fields.items():
+            setattr(self, field, value)
+        
+        if history is not None:
+            history.save()
+        self.save(update_fields=[*self.COST_UPDATE_FIELDS, *extra_fields])
     
     def get_effective_commission_rate(self):
         """Get commission rate, falling back to seller default."""
@@ -215,11 +340,16 @@ class Product(TimestampMixin, models.Model):
     
     @property
     def product_cost_incl_vat(self):
-        """Calculate cost including VAT."""
+        """
+        Calculate cost including VAT.
+        
+        Uses the `cost_incl_vat` annotation (computed in SQL) when available.
+        """
+        if hasattr(self, 'cost_incl_vat'):
+            return self.cost_incl_vat
         if self.product_cost_excl_vat is None:
             return None
-        from decimal import Decimal
-        vat = self.product_cost_excl_vat * (self.purchase_vat_rate / Decimal('100'))
+        vat = self.product_cost_excl_vat * (self.purchase_vat_rate / _DEC_100)
         return self.product_cost_excl_vat + vat
 
 
@@ -324,3 +454,60 @@ class BulkCostUpload(TimestampMixin, models.Model):
     
     def __str__(self):
         return f'{self.file_name} - {self.status}'
+
+
+class ProductDetailUpload(TimestampMixin, models.Model):
+    """
+    Track product detail (image, brand) updates from a Trendyol Excel export.
+    
+    Covers all seller accounts of the user; processed by a Celery task.
+    """
+    
+    STATUS_CHOICES = BulkCostUpload.STATUS_CHOICES
+    
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='product_detail_uploads'
+    )
+    
+    file_name = models.CharField(
+        _('Dosya Adı'),
+        max_length=255
+    )
+    file_path = models.FileField(
+        _('Dosya'),
+        upload_to='product_detail_uploads/%Y/%m/'
+    )
+    
+    status = models.CharField(
+        _('Durum'),
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='pending'
+    )
+    
+    # Results
+    total_rows = models.PositiveIntegerField(default=0)
+    success_count = models.PositiveIntegerField(default=0)
+    
+    error_details = models.JSONField(
+        _('Hata Detayları'),
+        default=list,
+        blank=True
+    )
+    
+    processed_at = models.DateTimeField(
+        _('İşlenme Tarihi'),
+        null=True,
+        blank=True
+    )
+    
+    class Meta:
+        db_table = 'product_detail_uploads'
+        verbose_name = _('Ürün Bilgisi Yüklemesi')
+        verbose_name_plural = _('Ürün Bilgisi Yüklemeleri')
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f'{self.file_name} - {self.status}'
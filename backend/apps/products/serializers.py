@@ -2,8 +2,10 @@
 Products App - Serializers
 """
 
+from django.core.cache import cache
+from django.db import models
 from rest_framework import serializers
-from .models import Product, ProductCostHistory, BulkCostUpload
+from .models import Product, ProductCostHistory, BulkCostUpload, ProductDetailUpload
 
 
 class ProductSerializer(serializers.ModelSerializer):
@@ -34,9 +36,57 @@ class ProductSerializer(serializers.ModelSerializer):
         ]
     
     def get_effective_commission_rate(self, obj):
+        # List views pass {seller_account_id: default_commission_rate} in context
+        seller_defaults = self.context.get('seller_defaults')
+        if obj.commission_rate is None and seller_defaults and obj.seller_account_id in seller_defaults:
+            return seller_defaults[obj.seller_account_id]
         return obj.get_effective_commission_rate()
 
 
+class CachedProductListSerializer(serializers.ListSerializer):
+    """
+    Product list representation with per-product caching.
+    
+    Rows are cached under the product's and its seller's updated_at, so
+    any change to either makes the old entry unreachable. A page is read
+    with one get_many and missing rows are written with one set_many.
+    """
+    
+    CACHE_TIMEOUT = 3600
+    
+    @staticmethod
+    def get_cache_key(product) -> str:
+        return (
+            f'product_row:{product.pk}:{product.updated_at.timestamp()}'
+            f':{product.seller_account.updated_at.timestamp()}'
+        )
+    
+    def to_representation(self, data):
+        products = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        keys = [self.get_cache_key(product) for product in products]
+        cached = cache.get_many(keys)
+        
+        result = []
+        missing = {}
+        for product, key in zip(products, keys):
+            row = cached.get(key)
+            if row is None:
+                row = self.child.to_representation(product)
+                missing[key] = row
+            result.append(row)
+        
+        if missing:
+            cache.set_many(missing, timeout=self.CACHE_TIMEOUT)
+        return result
+
+
+class CachedProductSerializer(ProductSerializer):
+    """ProductSerializer whose list output is cached per product."""
+    
+    class Meta(ProductSerializer.Meta):
+        list_serializer_class = CachedProductListSerializer
+
+
 class ProductCostUpdateSerializer(serializers.Serializer):
     """Serializer for updating product cost."""
     
@@ -93,6 +143,19 @@ class BulkCostUploadSerializer(serializers.ModelSerializer):
         ]
 
 
+class ProductDetailUploadSerializer(serializers.ModelSerializer):
+    """Serializer for product detail upload status."""
+    
+    class Meta:
+        model = ProductDetailUpload
+        fields = [
+            'id', 'file_name', 'status',
+            'total_rows', 'success_count',
+            'error_details', 'created_at', 'processed_at'
+        ]
+        read_only_fields = fields
+
+
 class BulkCostUploadCreateSerializer(serializers.Serializer):
     """Serializer for creating bulk upload."""
     
@@ -2,11 +2,78 @@
 Products App - Celery Tasks
 """
 
+from decimal import Decimal
+
 from celery import shared_task
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Rows per bulk_create/bulk_update flush
+BULK_BATCH_SIZE = 500
+
+# Rows between progress updates of a bulk upload
+PROGRESS_INTERVAL = 200
+
+_DEFAULT_VAT = Decimal('20.00')
+_CENT = Decimal('0.01')
+
+
+def _parse_decimal(value):
+    """
+    Parse an Excel cell value to a 2-place Decimal.
+    
+    Returns:
+        Decimal, or None for unparseable or non-finite (NaN/Infinity) values
+    """
+    try:
+        # int/Decimal convert exactly; floats go through str() so 2.675 stays 2.675
+        if isinstance(value, (int, Decimal)) and not isinstance(value, bool):
+            number = Decimal(value)
+        else:
+            number = Decimal(str(value))
+        if not number.is_finite():
+            return None
+        return number.quantize(_CENT)
+    except (ArithmeticError, ValueError, TypeError):
+        return None
+
+
+def _insert_cost_history(history_objs):
+    """
+    Insert unsaved ProductCostHistory rows.
+    
+    Uses COPY FROM STDIN on PostgreSQL (no SQL parsing per row),
+    bulk_create elsewhere.
+    """
+    from django.db import connections
+    from django.utils import timezone
+    
+    from .models import ProductCostHistory
+    
+    if not history_objs:
+        return
+    
+    connection = connections[ProductCostHistory.objects.db]
+    if connection.vendor != 'postgresql':
+        ProductCostHistory.objects.bulk_create(history_objs, batch_size=BULK_BATCH_SIZE)
+        return
+    
+    created_at = timezone.now()
+    with connection.cursor() as cursor:
+        with cursor.copy(
+            'COPY product_cost_history '
+            '(product_id, cost_excl_vat, vat_rate, effective_date, created_at) FROM STDIN'
+        ) as copy:
+            for history in history_objs:
+                copy.write_row((
+                    history.product_id,
+                    history.cost_excl_vat,
+                    history.vat_rate,
+                    history.effective_date,
+                    created_at,
+                ))
+
 
 @shared_task(bind=True, max_retries=3)
 def process_bulk_cost_upload(self, upload_id: int):
@@ -16,9 +83,11 @@ def process_bulk_cost_upload(self, upload_id: int):
     Expected Excel format:
     | Barkod | Maliyet (KDV Hariç) | Alış KDV % | Komisyon % |
     """
+    from django.db import transaction
     from django.utils import timezone
-    import openpyxl
+    from python_calamine import CalamineWorkbook
     
+    from .cache import invalidate_product_lists
     from .models import BulkCostUpload, Product
     
     try:
@@ -34,31 +103,89 @@ def process_bulk_cost_upload(self, upload_id: int):
     success_count = 0
     
     try:
-        # Load Excel file
-        wb = openpyxl.load_workbook(upload.file_path.path)
-        ws = wb.active
+        # Parse the first sheet with calamine (Rust reader, also handles .xls);
+        # skip_empty_area=False keeps sheet row numbers for error reports
+        wb = CalamineWorkbook.from_path(upload.file_path.path)
+        sheet_rows = wb.get_sheet_by_index(0).to_python(skip_empty_area=False)
+        
+        # First pass: read rows so all products can be fetched in one query
+        rows = []
+        total_rows = 0
+        for row_num, row in enumerate(sheet_rows[1:], start=2):
+            total_rows += 1
+            # Calamine returns '' for empty cells
+            values = [None if value == '' else value for value in row[:4]]
+            barcode_value, cost_value, vat_rate_value, commission_value = (values + [None] * 4)[:4]
+            # Numeric barcodes come back as floats (8690000000000.0)
+            if isinstance(barcode_value, float) and barcode_value.is_integer():
+                barcode_value = int(barcode_value)
+            barcode = str(barcode_value or '').strip()
+            if not barcode:
+                continue
+            rows.append((row_num, barcode, cost_value, vat_rate_value, commission_value))
         
         # Get total rows (excluding header)
-        total_rows = ws.max_row - 1
         upload.total_rows = total_rows
         upload.save(update_fields=['total_rows'])
         
-        # Process each row
-        for row_num in range(2, ws.max_row + 1):
+        # Keep the last row per barcode; earlier duplicates are reported
+        rows_by_barcode = {}
+        for row in rows:
+            duplicate = rows_by_barcode.get(row[1])
+            if duplicate:
+                errors.append({
+                    'row': duplicate[0],
+                    'barcode': row[1],
+                    'error': 'Tekrarlanan barkod, son satır kullanıldı'
+                })
+            rows_by_barcode[row[1]] = row
+        duplicate_count = len(rows) - len(rows_by_barcode)
+        rows = list(rows_by_barcode.values())
+        
+        # Barcodes are unique per seller account; load only the columns the
+        # cost update reads or writes
+        products = {
+            product.barcode: product
+            for product in Product.objects.filter(
+                seller_account=upload.seller_account,
+                barcode__in=list(rows_by_barcode)
+            ).only('id', 'barcode', 'commission_rate', *Product.COST_UPDATE_FIELDS)
+        }
+        
+        history_objs = []
+        products_to_update = {}
+        update_fields = Product.COST_UPDATE_FIELDS + ['commission_rate']
+        
+        def flush():
+            """Write collected history rows and product updates."""
+            with transaction.atomic():
+                # Lock the prefetched products that still exist; ones deleted
+                # since the prefetch are skipped (an upload never creates products)
+                existing = set(Product.objects.select_for_update().filter(
+                    pk__in=list(products_to_update)
+                ).values_list('pk', flat=True))
+                _insert_cost_history([h for h in history_objs if h.product_id in existing])
+                # UPDATE ... WHERE id IN (...) per batch, by primary key
+                updated = Product.objects.bulk_update(
+                    [p for pk, p in products_to_update.items() if pk in existing],
+                    update_fields,
+                    batch_size=BULK_BATCH_SIZE,
+                )
+            if updated:
+                invalidate_product_lists(upload.seller_account.user_id)
+            history_objs.clear()
+            products_to_update.clear()
+        
+        # Second pass: validate rows and apply updates in memory
+        processed = duplicate_count
+        for row_num, barcode, cost_value, vat_rate_value, commission_value in rows:
+            # Throttled progress; queryset update skips model save overhead
+            processed += 1
+            if processed % PROGRESS_INTERVAL == 0:
+                BulkCostUpload.objects.filter(pk=upload.pk).update(processed_rows=processed)
+            
             try:
-                barcode = str(ws.cell(row=row_num, column=1).value or '').strip()
-                cost_value = ws.cell(row=row_num, column=2).value
-                vat_rate_value = ws.cell(row=row_num, column=3).value
-                commission_value = ws.cell(row=row_num, column=4).value
-                
-                if not barcode:
-                    continue
-                
-                # Find product
-                product = Product.objects.filter(
-                    seller_account=upload.seller_account,
-                    barcode=barcode
-                ).first()
+                product = products.get(barcode)
                 
                 if not product:
                     errors.append({
@@ -77,12 +204,8 @@ def process_bulk_cost_upload(self, upload_id: int):
                     })
                     continue
                 
-                try:
-                    from decimal import Decimal
-                    cost = Decimal(str(cost_value))
-                    if cost < 0:
-                        raise ValueError('Negatif değer')
-                except (ValueError, TypeError):
+                cost = _parse_decimal(cost_value)
+                if cost is None or cost < 0:
                     errors.append({
                         'row': row_num,
                         'barcode': barcode,
@@ -91,37 +214,40 @@ def process_bulk_cost_upload(self, upload_id: int):
                     continue
                 
                 # Parse VAT rate (optional)
-                vat_rate = Decimal('20.00')
+                vat_rate = _DEFAULT_VAT
                 if vat_rate_value is not None:
-                    try:
-                        vat_rate = Decimal(str(vat_rate_value))
-                    except (ValueError, TypeError):
-                        pass
+                    parsed_vat_rate = _parse_decimal(vat_rate_value)
+                    if parsed_vat_rate is not None:
+                        vat_rate = parsed_vat_rate
                 
                 # Parse commission rate (optional)
                 if commission_value is not None:
-                    try:
-                        product.commission_rate = Decimal(str(commission_value))
-                    except (ValueError, TypeError):
-                        pass
+                    commission_rate = _parse_decimal(commission_value)
+                    if commission_rate is not None:
+                        product.commission_rate = commission_rate
                 
-                # Update product
-                product.update_cost(cost, vat_rate, track_history=True)
+                # Update product (written in the next flush)
+                history = product.apply_cost_update(cost, vat_rate, track_history=True)
+                if history is not None:
+                    history_objs.append(history)
+                products_to_update[product.pk] = product
                 success_count += 1
                 
-                # Update progress
-                upload.processed_rows = row_num - 1
-                upload.save(update_fields=['processed_rows'])
-                
             except Exception as e:
                 errors.append({
                     'row': row_num,
-                    'barcode': barcode if 'barcode' in locals() else 'N/A',
+                    'barcode': barcode,
                     'error': str(e)
                 })
+            
+            if len(products_to_update) >= BULK_BATCH_SIZE:
+                flush()
+        
+        flush()
         
         # Mark as completed
         upload.status = 'completed'
+        upload.processed_rows = processed
         upload.success_count = success_count
         upload.error_count = len(errors)
         upload.error_details = errors[:100]  # Limit stored errors
@@ -138,3 +264,162 @@ def process_bulk_cost_upload(self, upload_id: int):
         
         # Retry on transient errors
         raise self.retry(exc=e, countdown=60)
+
+
+def detail_header_map(header_row):
+    """
+    Map Trendyol export header names to column indexes.
+    
+    Returns:
+        Tuple of ({header: index}, missing required column names)
+    """
+    header_map = {}
+    for index, value in enumerate(header_row):
+        if value:
+            header_map[str(value).strip()] = index
+    
+    missing = [h for h in ('Barkod',) if h not in header_map]
+    return header_map, missing
+
+
+def missing_detail_columns_message(missing):
+    """Error message for a product detail file without required columns."""
+    return f'Eksik sütunlar: {", ".join(missing)}. "Barkod" sütunu gereklidir.'
+
+
+def _parse_detail_rows(rows):
+    """
+    Collect image_url/brand updates from Trendyol export rows.
+    
+    Args:
+        rows: Iterator of row value tuples, header row first
+    
+    Returns:
+        Tuple of ({barcode: {field: value}}, data row count), or
+        (None, missing column names) when the header lacks required columns
+    """
+    header_map, missing = detail_header_map(next(rows, ()))
+    if missing:
+        return None, missing
+    
+    col_barcode = header_map['Barkod']
+    # Try to find Image and Brand columns
+    col_image = header_map.get('Görsel Linki') or header_map.get('Görsel Linkleri') or header_map.get('Görsel 1')
+    col_brand = header_map.get('Marka')
+    
+    updates_by_barcode = {}
+    total_rows = 0
+    # Streamed rows stop at their last stored cell; pad to the header width
+    width = max(header_map.values()) + 1
+    
+    for row in rows:
+        total_rows += 1
+        if len(row) < width:
+            row = row + (None,) * (width - len(row))
+        raw_barcode = row[col_barcode]
+        if not raw_barcode:
+            continue
+        
+        # Clean barcode (handle float from Excel)
+        barcode = str(raw_barcode).strip()
+        if barcode.endswith('.0'):
+            barcode = barcode[:-2]
+        
+        updates = {}
+        
+        # Image
+        if col_image is not None and row[col_image]:
+            img_url = str(row[col_image]).strip()
+            # If multiple images (comma separated or newline), take first
+            if ',' in img_url:
+                img_url = img_url.split(',')[0].strip()
+            if '\n' in img_url:
+                img_url = img_url.split('\n')[0].strip()
+            if img_url:
+                updates['image_url'] = img_url
+        
+        # Brand
+        if col_brand is not None and row[col_brand]:
+            brand = str(row[col_brand]).strip()
+            if brand:
+                updates['brand'] = brand
+        
+        if updates:
+            # Later rows for the same barcode override earlier ones
+            updates_by_barcode.setdefault(barcode, {}).update(updates)
+    
+    return updates_by_barcode, total_rows
+
+
+@shared_task(bind=True, max_retries=3)
+def process_product_detail_upload(self, upload_id: int):
+    """
+    Apply image/brand updates from a Trendyol product export.
+    
+    Expected Excel format (header names, any order):
+    | Barkod | Görsel Linki / Görsel Linkleri / Görsel 1 | Marka |
+    """
+    import openpyxl
+    from django.utils import timezone
+    
+    from .cache import invalidate_product_lists
+    from .models import Product, ProductDetailUpload
+    
+    try:
+        upload = ProductDetailUpload.objects.get(pk=upload_id)
+    except ProductDetailUpload.DoesNotExist:
+        logger.error(f'Product detail upload {upload_id} not found')
+        return
+    
+    upload.status = 'processing'
+    upload.save(update_fields=['status'])
+    
+    try:
+        # Read-only mode streams rows from the archive instead of building
+        # every cell object
+        with upload.file_path.open('rb') as file_obj:
+            wb = openpyxl.load_workbook(file_obj, data_only=True, read_only=True)
+            try:
+                updates_by_barcode, result = _parse_detail_rows(wb.active.iter_rows(values_only=True))
+            finally:
+                wb.close()
+        
+        if updates_by_barcode is None:
+            # Bad file, not a transient error; no retry
+            upload.status = 'failed'
+            upload.error_details = [{'error': missing_detail_columns_message(result)}]
+            upload.processed_at = timezone.now()
+            upload.save(update_fields=['status', 'error_details', 'processed_at'])
+            return
+        
+        # Merged in one statement (COPY + UPDATE ... FROM on PostgreSQL)
+        updated_barcodes = Product.objects.apply_detail_updates(upload.user_id, updates_by_barcode)
+        updated_count = len(updated_barcodes)
+        if updated_count:
+            invalidate_product_lists(upload.user_id)
+        
+        # Barcodes in the file that matched none of the user's products
+        matched = set(updated_barcodes)
+        errors = [
+            {'barcode': barcode, 'error': 'Ürün bulunamadı'}
+            for barcode in updates_by_barcode
+            if barcode not in matched
+        ]
+        
+        upload.status = 'completed'
+        upload.total_rows = result
+        upload.success_count = updated_count
+        upload.error_details = errors[:100]  # Limit stored errors
+        upload.processed_at = timezone.now()
+        upload.save(update_fields=['status', 'total_rows', 'success_count', 'error_details', 'processed_at'])
+        
+        logger.info(f'Product detail upload {upload_id} completed: {updated_count} products updated')
+        
+    except Exception as e:
+        logger.exception(f'Product detail upload {upload_id} failed: {e}')
+        upload.status = 'failed'
+        upload.error_details = [{'error': str(e)}]
+        upload.save(update_fields=['status', 'error_details'])
+        
+        # Retry on transient errors
+        raise self.retry(exc=e, countdown=60)
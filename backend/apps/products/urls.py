@@ -14,6 +14,7 @@ from .views import (
     ProductsWithoutCostView,
     ProductExportView,
     ProductUpdateFromExcelView,
+    ProductDetailUploadStatusView,
 )
 
 app_name = 'products'
@@ -30,6 +31,7 @@ urlpatterns = [
     path('bulk-upload/<int:pk>/status/', BulkCostUploadStatusView.as_view(), name='bulk_upload_status'),
     path('bulk-uploads/', BulkCostUploadListView.as_view(), name='bulk_upload_list'),
     path('update-from-excel/', ProductUpdateFromExcelView.as_view(), name='update_from_excel'),
+    path('update-from-excel/<int:pk>/status/', ProductDetailUploadStatusView.as_view(), name='update_from_excel_status'),
     
     # Special views
     path('without-cost/', ProductsWithoutCostView.as_view(), name='without_cost'),
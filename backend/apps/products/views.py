@@ -7,17 +7,85 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser
-from django.db.models import Q
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, DecimalField, ExpressionWrapper, F, Q, Value, When
+from django.db.models.functions import NullIf
+from decimal import Decimal
 
-from .models import Product, ProductCostHistory, BulkCostUpload
+from .cache import PRODUCT_LIST_CACHE_TIMEOUT, get_product_list_cache_key, invalidate_product_lists
+from .models import Product, ProductCostHistory, BulkCostUpload, ProductDetailUpload
 from .serializers import (
     ProductSerializer,
+    CachedProductSerializer,
     ProductCostUpdateSerializer,
     ProductCostHistorySerializer,
     BulkCostUploadSerializer,
     BulkCostUploadCreateSerializer,
+    ProductDetailUploadSerializer,
 )
 
+# Columns read by ProductSerializer; the seller join is limited to the two
+# seller fields it uses instead of the whole account row
+PRODUCT_SERIALIZER_FIELDS = [
+    'id', 'barcode', 'product_code', 'trendyol_product_id',
+    'title', 'brand', 'category', 'category_id',
+    'image_url', 'color', 'size', 'desi', 'stock',
+    'product_cost_excl_vat', 'purchase_vat_rate', 'sales_vat_rate', 'commission_rate',
+    'is_active', 'has_cost_data',
+    'cost_updated_at', 'last_order_date', 'total_quantity_sold',
+    'created_at', 'updated_at',
+    'seller_account__shop_name', 'seller_account__default_commission_rate',
+    'seller_account__updated_at',
+]
+
+
+def _cost_incl_vat():
+    """DB-side cost incl. VAT, NULL when the product has no cost."""
+    return ExpressionWrapper(
+        F('product_cost_excl_vat') * (1 + F('purchase_vat_rate') / Value(Decimal('100.0'))),
+        output_field=DecimalField(max_digits=14, decimal_places=2)
+    )
+
+
+def _serialized_products(user):
+    """
+    The user's products narrowed to the columns ProductSerializer reads.
+    
+    Seller joined in, cost incl. VAT computed in SQL.
+    """
+    return Product.objects.filter(
+        seller_account__user=user
+    ).select_related('seller_account').only(*PRODUCT_SERIALIZER_FIELDS).annotate(
+        # Read by Product.product_cost_incl_vat instead of per-row Decimal math
+        cost_incl_vat=_cost_incl_vat()
+    )
+
+
+def _get_seller_defaults(user):
+    """Map the user's seller account ids to their default commission rates."""
+    from apps.sellers.models import SellerAccount
+    return dict(
+        SellerAccount.objects.filter(user=user).values_list('id', 'default_commission_rate')
+    )
+
+
+class ProductPagination(PageNumberPagination):
+    """
+    Page-number pagination for product lists.
+    
+    Lists keep the recently-sold-first order (-last_order_date, title),
+    which has no unique non-null key to seek a cursor on.
+    """
+    page_size = 50
+
+
+class BulkCostUploadCursorPagination(CursorPagination):
+    """Keyset pagination for bulk upload history."""
+    ordering = '-id'
+    page_size = 20
+
 
 class ProductListView(generics.ListAPIView):
     """
@@ -31,14 +99,27 @@ class ProductListView(generics.ListAPIView):
     - category: Filter by category
     - brand: Filter by brand
     """
-    serializer_class = ProductSerializer
+    serializer_class = CachedProductSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = ProductPagination
+    
+    def list(self, request, *args, **kwargs):
+        # Pages are cached per user and full URI (filters, page, host for the
+        # next/previous links) until a product write bumps the user's version
+        cache_key = get_product_list_cache_key(request.user.id, request.build_absolute_uri())
+        data = cache.get(cache_key)
+        if data is None:
+            data = super().list(request, *args, **kwargs).data
+            cache.set(cache_key, data, timeout=PRODUCT_LIST_CACHE_TIMEOUT)
+        return Response(data)
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['seller_defaults'] = _get_seller_defaults(self.request.user)
+        return context
     
     def get_queryset(self):
-        user = self.request.user
-        queryset = Product.objects.filter(
-            seller_account__user=user
-        ).select_related('seller_account')
+        queryset = _serialized_products(self.request.user)
         
         # Apply filters
         params = self.request.query_params
@@ -55,6 +136,7 @@ class ProductListView(generics.ListAPIView):
         if is_active is not None:
             queryset = queryset.filter(is_active=is_active.lower() == 'true')
         
+        # Served by the pg_trgm indexes on PostgreSQL (products migration 0003)
         search = params.get('search')
         if search:
             queryset = queryset.filter(
@@ -71,7 +153,8 @@ class ProductListView(generics.ListAPIView):
         if brand:
             queryset = queryset.filter(brand__icontains=brand)
         
-        return queryset
+        # Recently sold first; id breaks ties so pages don't overlap
+        return queryset.order_by('-last_order_date', 'title', 'id')
 
 
 class ProductDetailView(generics.RetrieveAPIView):
@@ -82,9 +165,7 @@ class ProductDetailView(generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Product.objects.filter(
-            seller_account__user=self.request.user
-        )
+        return _serialized_products(self.request.user)
 
 
 class ProductCostUpdateView(APIView):
@@ -95,7 +176,12 @@ class ProductCostUpdateView(APIView):
     
     def patch(self, request, pk):
         try:
-            product = Product.objects.get(
+            # Serialized columns only, seller joined in; the response is built
+            # from this instance after the update, without a reload. Not taken
+            # from _serialized_products: its cost_incl_vat would go stale.
+            product = Product.objects.select_related('seller_account').only(
+                *PRODUCT_SERIALIZER_FIELDS
+            ).get(
                 pk=pk,
                 seller_account__user=request.user
             )
@@ -110,19 +196,18 @@ class ProductCostUpdateView(APIView):
         
         data = serializer.validated_data
         
-        # Update cost with history tracking
+        # Cost (with history) and the optional rates are written in one UPDATE
         product.update_cost(
             cost_excl_vat=data['product_cost_excl_vat'],
             vat_rate=data.get('purchase_vat_rate'),
-            track_history=True
+            track_history=True,
+            extra_fields={
+                field: data[field]
+                for field in ('sales_vat_rate', 'commission_rate')
+                if field in data
+            }
         )
-        
-        # Update other fields if provided
-        if 'sales_vat_rate' in data:
-            product.sales_vat_rate = data['sales_vat_rate']
-        if 'commission_rate' in data:
-            product.commission_rate = data['commission_rate']
-        product.save()
+        invalidate_product_lists(request.user.id)
         
         return Response({
             'success': True,
@@ -173,17 +258,19 @@ class BulkCostUploadView(APIView):
                 'message': 'Satıcı hesabı bulunamadı.'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        # Create upload record
-        upload = BulkCostUpload.objects.create(
-            seller_account=seller_account,
-            file_name=file.name,
-            file_path=file,
-            status='pending'
-        )
-        
-        # Queue processing task
         from apps.products.tasks import process_bulk_cost_upload
-        process_bulk_cost_upload.delay(upload.id)
+        
+        with transaction.atomic():
+            # Create upload record
+            upload = BulkCostUpload.objects.create(
+                seller_account=seller_account,
+                file_name=file.name,
+                file_path=file,
+                status='pending'
+            )
+            
+            # Queue processing task once the row is committed (visible to the worker)
+            transaction.on_commit(lambda: process_bulk_cost_upload.delay(upload.id))
         
         return Response({
             'success': True,
@@ -200,7 +287,7 @@ class BulkCostUploadStatusView(APIView):
     
     def get(self, request, pk):
         try:
-            upload = BulkCostUpload.objects.get(
+            upload = BulkCostUpload.objects.select_related('seller_account').get(
                 pk=pk,
                 seller_account__user=request.user
             )
@@ -222,15 +309,17 @@ class BulkCostUploadListView(generics.ListAPIView):
     """
     serializer_class = BulkCostUploadSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = BulkCostUploadCursorPagination
     
     def get_queryset(self):
         seller_id = self.request.query_params.get('seller_account')
         queryset = BulkCostUpload.objects.filter(
             seller_account__user=self.request.user
-        )
+        ).select_related('seller_account')
         if seller_id:
             queryset = queryset.filter(seller_account_id=seller_id)
-        return queryset.order_by('-created_at')[:20]
+        # Ordering and page size come from BulkCostUploadCursorPagination
+        return queryset
 
 
 class ProductsWithoutCostView(generics.ListAPIView):
@@ -241,16 +330,21 @@ class ProductsWithoutCostView(generics.ListAPIView):
     serializer_class = ProductSerializer
     permission_classes = [IsAuthenticated]
     
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['seller_defaults'] = _get_seller_defaults(self.request.user)
+        return context
+    
     def get_queryset(self):
         seller_id = self.request.query_params.get('seller_account')
-        queryset = Product.objects.filter(
-            seller_account__user=self.request.user,
+        queryset = _serialized_products(self.request.user).filter(
             has_cost_data=False,
             is_active=True
         )
         if seller_id:
             queryset = queryset.filter(seller_account_id=seller_id)
-        return queryset
+        # These rarely have a last_order_date; skip the default NULL-heavy sort
+        return queryset.order_by('title')
 
 
 class ProductExportView(APIView):
@@ -260,22 +354,22 @@ class ProductExportView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        from django.http import HttpResponse
+        import tempfile
+        from django.http import FileResponse
         import openpyxl
         from openpyxl.utils import get_column_letter
         
         seller_id = request.query_params.get('seller_account')
         queryset = Product.objects.filter(
             seller_account__user=request.user
-        ).select_related('seller_account')
+        )
         
         if seller_id:
             queryset = queryset.filter(seller_account_id=seller_id)
         
-        # Create workbook
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = 'Ürünler'
+        # Write-only workbook streams rows instead of keeping every cell object
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet('Ürünler')
         
         # Headers
         headers = [
@@ -283,121 +377,114 @@ class ProductExportView(APIView):
             'Ürün Maliyeti (KDV Dahil)', 'Maliyet (KDV Hariç)', 'Maliyet KDV Oranı', 
             'Satış KDV Oranı', 'Komisyon Oranı', 'Mağaza'
         ]
-        for col, header in enumerate(headers, 1):
-            ws.cell(row=1, column=col, value=header)
-        
-        # Data
-        for row, product in enumerate(queryset, 2):
-            ws.cell(row=row, column=1, value=product.barcode)
-            ws.cell(row=row, column=2, value=product.product_code)
-            ws.cell(row=row, column=3, value=product.title)
-            ws.cell(row=row, column=4, value=product.brand)
-            ws.cell(row=row, column=5, value=product.category)
-            ws.cell(row=row, column=6, value=product.image_url)
-            
-            # Calculate Cost Inc VAT
-            cost_excl = float(product.product_cost_excl_vat) if product.product_cost_excl_vat else 0
-            vat_rate = float(product.purchase_vat_rate) if product.purchase_vat_rate else 0
-            cost_inc = cost_excl * (1 + vat_rate / 100)
-            
-            ws.cell(row=row, column=7, value=cost_inc if cost_excl > 0 else None)
-            ws.cell(row=row, column=8, value=cost_excl if cost_excl > 0 else None)
-            ws.cell(row=row, column=9, value=vat_rate)
-            ws.cell(row=row, column=10, value=float(product.sales_vat_rate))
-            ws.cell(row=row, column=11, value=float(product.commission_rate) if product.commission_rate else None)
-            ws.cell(row=row, column=12, value=product.seller_account.shop_name)
-        
-        # Auto-width columns
+        
+        # Fixed column widths (must be set before the first row in write-only mode)
         for col in range(1, len(headers) + 1):
             ws.column_dimensions[get_column_letter(col)].width = 15
         
-        # Response
-        response = HttpResponse(
+        ws.append(headers)
+        
+        # Data as plain tuples in header order (no model instances), fetched in
+        # chunks through a cursor; cost incl. VAT and the blank-when-unset
+        # columns are computed by the database. openpyxl writes Decimals as numbers.
+        has_cost = Q(product_cost_excl_vat__gt=0)
+        rows = queryset.values_list(
+            'barcode', 'product_code', 'title', 'brand', 'category', 'image_url',
+            Case(When(has_cost, then=_cost_incl_vat())),
+            Case(When(has_cost, then=F('product_cost_excl_vat'))),
+            'purchase_vat_rate', 'sales_vat_rate',
+            NullIf('commission_rate', Value(0)),
+            'seller_account__shop_name',
+        ).iterator(chunk_size=2000)
+        for row in rows:
+            ws.append(row)
+        
+        # Response streamed from a temporary file instead of an in-memory buffer;
+        # FileResponse closes (and so deletes) the file when done
+        output = tempfile.TemporaryFile()
+        wb.save(output)
+        output.seek(0)
+        
+        return FileResponse(
+            output,
+            as_attachment=True,
+            filename='urunler.xlsx',
             content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
         )
-        response['Content-Disposition'] = 'attachment; filename=urunler.xlsx'
-        wb.save(response)
-        
-        return response
 
 class ProductUpdateFromExcelView(APIView):
     """
     Update product details (Image, Brand) from standard Trendyol Excel export.
+    
+    The file is stored and processed by a Celery task; poll
+    ProductDetailUploadStatusView for the result.
     """
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
     
     def post(self, request):
-        import openpyxl
-        
         file_obj = request.FILES.get('file')
         if not file_obj:
             return Response({'success': False, 'message': 'Dosya yüklenmedi.'}, status=400)
-            
+        
+        import openpyxl
+        from apps.products.tasks import (
+            detail_header_map,
+            missing_detail_columns_message,
+            process_product_detail_upload,
+        )
+        
+        # Header checked here so a malformed file is rejected before it is queued
+        wb = None
         try:
-            wb = openpyxl.load_workbook(file_obj, data_only=True)
-            ws = wb.active
-            
-            # Map headers
-            header_map = {}
-            for cell in ws[1]:
-                if cell.value:
-                    header_map[str(cell.value).strip()] = cell.column - 1
-            
-            required = ['Barkod']
-            missing = [h for h in required if h not in header_map]
-            if missing:
-                 return Response({'success': False, 'message': f'Eksik sütunlar: {", ".join(missing)}. "Barkod" sütunu gereklidir.'}, status=400)
-            
-            col_barcode = header_map['Barkod']
-            # Try to find Image and Brand columns
-            col_image = header_map.get('Görsel Linki') or header_map.get('Görsel Linkleri') or header_map.get('Görsel 1')
-            col_brand = header_map.get('Marka')
-            
-            updated_count = 0
-            
-            for row in ws.iter_rows(min_row=2, values_only=True):
-                raw_barcode = row[col_barcode]
-                if not raw_barcode:
-                    continue
-                
-                # Clean barcode (handle float from Excel)
-                barcode = str(raw_barcode).strip()
-                if barcode.endswith('.0'):
-                    barcode = barcode[:-2]
-                    
-                updates = {}
-                
-                # Image
-                if col_image is not None and row[col_image]:
-                     img_url = str(row[col_image]).strip()
-                     # If multiple images (comma separated or newline), take first
-                     if ',' in img_url:
-                          img_url = img_url.split(',')[0].strip()
-                     if '\n' in img_url:
-                          img_url = img_url.split('\n')[0].strip()
-                     if img_url:
-                          updates['image_url'] = img_url
-                
-                # Brand
-                if col_brand is not None and row[col_brand]:
-                     brand = str(row[col_brand]).strip()
-                     if brand:
-                          updates['brand'] = brand
-                          
-                if updates:
-                     # Update matching products
-                     Product.objects.filter(
-                         seller_account__user=request.user, 
-                         barcode=barcode
-                     ).update(**updates)
-                     updated_count += 1
-                     
-            return Response({
-                'success': True, 
-                'message': f'{updated_count} ürün bilgisi Excel\'den güncellendi.'
-            })
-            
+            wb = openpyxl.load_workbook(file_obj, data_only=True, read_only=True)
+            header_row = next(wb.active.iter_rows(max_row=1, values_only=True), ())
         except Exception as e:
-            # Handle specific openpyxl errors or generic
             return Response({'success': False, 'message': f'Dosya işlenirken hata: {str(e)}'}, status=400)
+        finally:
+            if wb is not None:
+                wb.close()
+        
+        _, missing = detail_header_map(header_row)
+        if missing:
+            return Response({'success': False, 'message': missing_detail_columns_message(missing)}, status=400)
+        file_obj.seek(0)
+        
+        with transaction.atomic():
+            # Create upload record
+            upload = ProductDetailUpload.objects.create(
+                user=request.user,
+                file_name=file_obj.name,
+                file_path=file_obj,
+                status='pending'
+            )
+            
+            # Queue processing task once the row is committed (visible to the worker)
+            transaction.on_commit(lambda: process_product_detail_upload.delay(upload.id))
+        
+        return Response({
+            'success': True,
+            'message': 'Dosya yüklendi, işleme alındı.',
+            'data': ProductDetailUploadSerializer(upload).data
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class ProductDetailUploadStatusView(APIView):
+    """
+    Get status of a product detail upload.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, pk):
+        try:
+            upload = ProductDetailUpload.objects.get(pk=pk, user=request.user)
+        except ProductDetailUpload.DoesNotExist:
+            return Response({
+                'success': False,
+                'message': 'Yükleme kaydı bulunamadı.'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response({
+            'success': True,
+            'data': ProductDetailUploadSerializer(upload).data
+        })
@@ -10,6 +10,7 @@ from .models import SellerAccount, SellerSyncLog
 class SellerAccountAdmin(admin.ModelAdmin):
     list_display = ['shop_name', 'seller_id', 'user', 'is_active', 'sync_status', 'last_sync_at', 'total_orders_synced']
     list_filter = ['is_active', 'sync_status', 'created_at']
+    # Served by pg_trgm indexes (sellers 0002, accounts 0002)
     search_fields = ['shop_name', 'seller_id', 'user__email']
     ordering = ['-created_at']
     readonly_fields = ['created_at', 'updated_at', 'last_sync_at', 'last_sync_order_date', 'total_orders_synced']
@@ -31,5 +32,5 @@ class SellerSyncLogAdmin(admin.ModelAdmin):
     search_fields = ['seller_account__shop_name']
     ordering = ['-started_at']
     readonly_fields = ['seller_account', 'status', 'sync_type', 'started_at', 'completed_at',
-                       'orders_fetched', 'orders_created', 'orders_updated', 'items_processed',
+                       'duration_seconds', 'orders_fetched', 'orders_created', 'orders_updated', 'items_processed',
                        'error_message', 'error_details']
@@ -0,0 +1,41 @@
+# Trigram indexes for SellerAccountAdmin search (PostgreSQL only)
+
+from django.db import migrations
+
+# Django compiles icontains to UPPER(column::text) LIKE UPPER(%s) on PostgreSQL,
+# so the indexes are built on the same UPPER() expression
+TRIGRAM_INDEXES = [
+    ('seller_shop_name_trgm', 'shop_name'),
+    ('seller_seller_id_trgm', 'seller_id'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON seller_accounts '
+            f'USING gin (UPPER({column}::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sellers', '0001_initial'),
+        # users.email is indexed for the user__email search field
+        ('accounts', '0002_user_email_trigram_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
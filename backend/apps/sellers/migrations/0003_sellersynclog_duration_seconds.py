@@ -0,0 +1,33 @@
+# Generated by Django 5.1.15 on 2026-10-16 13:50
+
+from django.db import migrations, models
+
+
+def backfill_duration_seconds(apps, schema_editor):
+    SellerSyncLog = apps.get_model('sellers', 'SellerSyncLog')
+    logs = []
+    for log in SellerSyncLog.objects.filter(
+        completed_at__isnull=False, started_at__isnull=False
+    ).only('id', 'started_at', 'completed_at').iterator(chunk_size=1000):
+        log.duration_seconds = (log.completed_at - log.started_at).total_seconds()
+        logs.append(log)
+        if len(logs) >= 1000:
+            SellerSyncLog.objects.bulk_update(logs, ['duration_seconds'])
+            logs = []
+    SellerSyncLog.objects.bulk_update(logs, ['duration_seconds'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sellers', '0002_seller_account_search_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sellersynclog',
+            name='duration_seconds',
+            field=models.FloatField(blank=True, null=True, verbose_name='Süre (saniye)'),
+        ),
+        migrations.RunPython(backfill_duration_seconds, migrations.RunPython.noop),
+    ]
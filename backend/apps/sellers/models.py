@@ -4,6 +4,8 @@ Sellers App - Models
 Trendyol seller account models with encrypted API credentials.
 """
 
+from functools import cached_property
+
 from django.db import models
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
@@ -12,6 +14,17 @@ from core.mixins import TimestampMixin
 from core.encryption import encrypt_credential, decrypt_credential
 from core.validators import validate_trendyol_seller_id, validate_api_key
 
+# Fernet tokens start with 'gAAAAA' when base64 encoded (version byte 0x80
+# followed by the high bytes of the timestamp)
+_FERNET_PREFIX = 'gAAAAA'
+
+
+def _mask_credential(value):
+    """Mask a stored credential, keeping only its last 4 characters."""
+    if not value:
+        return None
+    return '••••••••' + value[-4:] if len(value) > 4 else '••••••••'
+
 
 class SellerAccount(TimestampMixin, models.Model):
     """
@@ -28,6 +41,9 @@ class SellerAccount(TimestampMixin, models.Model):
         ('error', 'Hata'),
     ]
     
+    # Encrypted fields, compared with their stored values on save
+    CREDENTIAL_FIELDS = ('api_key', 'api_secret')
+    
     # Owner
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -122,40 +138,77 @@ class SellerAccount(TimestampMixin, models.Model):
     def __str__(self):
         return f'{self.shop_name} ({self.seller_id})'
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Snapshot stored credentials so save() can detect changes without a query."""
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_credentials()
+        return instance
+    
     def save(self, *args, **kwargs):
         """Encrypt API credentials before saving."""
-        # Check if this is an update with new credentials
-        if self.pk:
-            try:
-                old_instance = SellerAccount.objects.get(pk=self.pk)
-                # Only encrypt if values changed (new values won't be encrypted yet)
-                if self.api_key != old_instance.api_key and not self._is_encrypted(self.api_key):
-                    self.api_key = encrypt_credential(self.api_key)
-                if self.api_secret != old_instance.api_secret and not self._is_encrypted(self.api_secret):
-                    self.api_secret = encrypt_credential(self.api_secret)
-            except SellerAccount.DoesNotExist:
-                pass
-        else:
-            # New instance - encrypt credentials
-            if not self._is_encrypted(self.api_key):
-                self.api_key = encrypt_credential(self.api_key)
-            if not self._is_encrypted(self.api_secret):
-                self.api_secret = encrypt_credential(self.api_secret)
+        for field in self.CREDENTIAL_FIELDS:
+            # Deferred credentials are not saved, so there is nothing to encrypt
+            value = self.__dict__.get(field)
+            if value is None:
+                continue
+            # Only encrypt new or changed values (new values won't be encrypted yet)
+            if value != getattr(self, '_stored_credentials', {}).get(field) and not self._is_encrypted(value):
+                setattr(self, field, encrypt_credential(value))
         
         super().save(*args, **kwargs)
+        self._snapshot_credentials()
+        self._clear_decrypted_credentials()
+    
+    def refresh_from_db(self, *args, **kwargs):
+        """Reload from database, dropping cached decrypted credentials."""
+        super().refresh_from_db(*args, **kwargs)
+        self._snapshot_credentials()
+        self._clear_decrypted_credentials()
+    
+    def _snapshot_credentials(self):
+        """Remember the credential values as stored in the database."""
+        self._stored_credentials = {
+            field: self.__dict__.get(field) for field in self.CREDENTIAL_FIELDS
+        }
+    
+    def _clear_decrypted_credentials(self):
+        """Invalidate the cached decrypted and masked API key/secret."""
+        for name in ('decrypted_api_key', 'decrypted_api_secret', 'api_key_masked', 'api_secret_masked'):
+            self.__dict__.pop(name, None)
     
     def _is_encrypted(self, value: str) -> bool:
         """Check if a value appears to be Fernet encrypted."""
-        # Fernet tokens start with 'gAAAAA' when base64 encoded
-        return value.startswith('gAAAAA') if value else False
+        # Prefix check only; cost does not depend on the token length
+        return bool(value) and value.startswith(_FERNET_PREFIX)
+    
+    @cached_property
+    def decrypted_api_key(self) -> str:
+        """Decrypted API key, cached on the instance."""
+        return decrypt_credential(self.api_key)
+    
+    @cached_property
+    def decrypted_api_secret(self) -> str:
+        """Decrypted API secret, cached on the instance."""
+        return decrypt_credential(self.api_secret)
+    
+    @cached_property
+    def api_key_masked(self):
+        """Masked API key for responses, cached on the instance."""
+        return _mask_credential(self.api_key)
+    
+    @cached_property
+    def api_secret_masked(self):
+        """Masked API secret for responses, cached on the instance."""
+        return _mask_credential(self.api_secret)
     
     def get_decrypted_api_key(self) -> str:
         """Get decrypted API key."""
-        return decrypt_credential(self.api_key)
+        return self.decrypted_api_key
     
     def get_decrypted_api_secret(self) -> str:
         """Get decrypted API secret."""
-        return decrypt_credential(self.api_secret)
+        return self.decrypted_api_secret
     
     @property
     def is_credentials_valid(self) -> bool:
@@ -214,6 +267,12 @@ class SellerSyncLog(models.Model):
     
     started_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
+    # Stored when the sync finishes (None while in progress)
+    duration_seconds = models.FloatField(
+        _('Süre (saniye)'),
+        null=True,
+        blank=True
+    )
     
     # Sync details
     sync_type = models.CharField(
@@ -257,30 +316,32 @@ class SellerSyncLog(models.Model):
     def __str__(self):
         return f'{self.seller_account} - {self.started_at}'
     
-    def mark_completed(self, orders_fetched=0, orders_created=0, orders_updated=0, items_processed=0):
+    def mark_completed(self, orders_fetched=0, orders_created=0, orders_updated=0, items_processed=0,
+                       error_details: dict = None):
         """Mark sync log as completed with results."""
         from django.utils import timezone
         self.status = 'completed'
-        self.completed_at = timezone.now()
+        self._set_completed_at(timezone.now())
         self.orders_fetched = orders_fetched
         self.orders_created = orders_created
         self.orders_updated = orders_updated
         self.items_processed = items_processed
+        if error_details:
+            self.error_details = error_details
         self.save()
     
     def mark_failed(self, error_message: str, error_details: dict = None):
         """Mark sync log as failed."""
         from django.utils import timezone
         self.status = 'failed'
-        self.completed_at = timezone.now()
+        self._set_completed_at(timezone.now())
         self.error_message = error_message
         if error_details:
             self.error_details = error_details
         self.save()
     
-    @property
-    def duration_seconds(self):
-        """Calculate sync duration in seconds."""
-        if self.completed_at and self.started_at:
-            return (self.completed_at - self.started_at).total_seconds()
-        return None
+    def _set_completed_at(self, completed_at):
+        """Set the completion time and the stored duration."""
+        self.completed_at = completed_at
+        if self.started_at:
+            self.duration_seconds = (completed_at - self.started_at).total_seconds()
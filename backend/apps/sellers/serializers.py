@@ -10,8 +10,8 @@ class SellerAccountSerializer(serializers.ModelSerializer):
     """Serializer for seller account listing and detail."""
     
     # Mask credentials in responses
-    api_key_masked = serializers.SerializerMethodField()
-    api_secret_masked = serializers.SerializerMethodField()
+    api_key_masked = serializers.CharField(read_only=True, allow_null=True)
+    api_secret_masked = serializers.CharField(read_only=True, allow_null=True)
     
     class Meta:
         model = SellerAccount
@@ -27,18 +27,6 @@ class SellerAccountSerializer(serializers.ModelSerializer):
             'id', 'sync_status', 'last_sync_at', 'last_sync_order_date',
             'last_sync_error', 'total_orders_synced', 'created_at', 'updated_at'
         ]
-    
-    def get_api_key_masked(self, obj):
-        """Return masked API key."""
-        if obj.api_key:
-            return '••••••••' + obj.api_key[-4:] if len(obj.api_key) > 4 else '••••••••'
-        return None
-    
-    def get_api_secret_masked(self, obj):
-        """Return masked API secret."""
-        if obj.api_secret:
-            return '••••••••' + obj.api_secret[-4:] if len(obj.api_secret) > 4 else '••••••••'
-        return None
 
 
 class SellerAccountCreateSerializer(serializers.ModelSerializer):
@@ -2,11 +2,15 @@
 Sellers App - Views
 """
 
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
 from rest_framework import generics, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
+from apps.products.cache import invalidate_product_lists
 from .models import SellerAccount, SellerSyncLog
 from .serializers import (
     SellerAccountSerializer,
@@ -16,6 +20,94 @@ from .serializers import (
     TriggerSyncSerializer,
 )
 
+logger = logging.getLogger(__name__)
+
+# Columns read by SellerSyncLogSerializer; error_details (JSON) is not
+# serialized and stays in the database
+SYNC_LOG_SERIALIZER_FIELDS = [
+    'id', 'seller_account_id', 'status', 'sync_type',
+    'started_at', 'completed_at', 'duration_seconds',
+    'date_range_start', 'date_range_end',
+    'orders_fetched', 'orders_created', 'orders_updated',
+    'items_processed', 'error_message',
+]
+
+
+def _get_owned_seller(user, pk, fields=None):
+    """
+    Fetch one of the user's seller accounts in a single query.
+    
+    Args:
+        user: Owner of the account
+        pk: SellerAccount id
+        fields: Optional columns to load (others are deferred)
+    
+    Returns:
+        SellerAccount, or None if the user has no such account
+    """
+    queryset = SellerAccount.objects.all()
+    if fields:
+        queryset = queryset.only(*fields)
+    try:
+        return queryset.get(pk=pk, user=user)
+    except SellerAccount.DoesNotExist:
+        return None
+
+
+# Runs TriggerSyncView's in-process syncs in development, off the request thread
+_dev_sync_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='dev-sync')
+
+
+def _run_dev_sync(seller_id, sync_type, start_date, end_date):
+    """
+    Run a full product + order sync in-process (development, no Celery).
+    
+    Results and failures are stored on the seller account and its sync
+    log by the sync services, as with the Celery task.
+    """
+    from django.db import connections
+    from apps.integrations.trendyol.sync_service import OrderSyncService, ProductSyncService
+    
+    try:
+        seller = SellerAccount.objects.get(pk=seller_id)
+        
+        # One API client (pooled session, decrypted credentials) for all steps
+        product_service = ProductSyncService(seller)
+        
+        # 1. Sync Products (Full details: images, brand, category, etc.)
+        # This might fail if API key doesn't have product permissions
+        try:
+            products_result = product_service.sync_products()
+            logger.info(f'Product sync for seller {seller_id}: {products_result.get("products_synced", 0)} products')
+        except Exception as e:
+            logger.warning(f'Product sync failed for seller {seller_id}: {e}')
+        
+        # 2. Sync Orders (marks the seller and sync log completed/failed)
+        order_service = OrderSyncService(seller, client=product_service.client)
+        order_service.sync_orders(
+            sync_type=sync_type,
+            start_date=start_date,
+            end_date=end_date
+        )
+        
+        # 3. Enrich Products from Web (Fallback)
+        try:
+            # Provide robustness: try to enrich missing details (images/brands)
+            # even if API failed or returned partial data
+            enriched_count = product_service.enrich_products_from_web()
+            logger.info(f'Enriched {enriched_count} products from web for seller {seller_id}')
+        except Exception as e:
+            logger.warning(f'Enrichment failed for seller {seller_id}: {e}')
+    except Exception as e:
+        logger.exception(f'Sync error for seller {seller_id}: {e}')
+        # sync_orders already marks its own failures; this covers the steps before it
+        SellerAccount.objects.filter(pk=seller_id, sync_status='syncing').update(
+            sync_status='error', last_sync_error=str(e)
+        )
+    finally:
+        # The thread's DB connections are not closed by the request cycle
+        connections.close_all()
+
 
 class SellerAccountListCreateView(generics.ListCreateAPIView):
     """
@@ -63,6 +155,8 @@ class SellerAccountDetailView(generics.RetrieveUpdateDestroyAPIView):
     
     def update(self, request, *args, **kwargs):
         response = super().update(request, *args, **kwargs)
+        # Product lists show the shop name and default commission rate
+        invalidate_product_lists(request.user.id)
         return Response({
             'success': True,
             'message': 'Satıcı hesabı güncellendi.',
@@ -73,6 +167,7 @@ class SellerAccountDetailView(generics.RetrieveUpdateDestroyAPIView):
         seller = self.get_object()
         shop_name = seller.shop_name
         seller.delete()
+        invalidate_product_lists(request.user.id)
         
         return Response({
             'success': True,
@@ -87,9 +182,8 @@ class TriggerSyncView(APIView):
     permission_classes = [IsAuthenticated]
     
     def post(self, request, pk):
-        try:
-            seller = SellerAccount.objects.get(pk=pk, user=request.user)
-        except SellerAccount.DoesNotExist:
+        seller = _get_owned_seller(request.user, pk)
+        if seller is None:
             return Response({
                 'success': False,
                 'message': 'Satıcı hesabı bulunamadı.'
@@ -121,71 +215,19 @@ class TriggerSyncView(APIView):
         end_date = serializer.validated_data.get('end_date')
         
         if settings.DEBUG:
-            # Run synchronously in development (no Celery/Redis needed)
-            try:
-                from apps.integrations.trendyol.sync_service import OrderSyncService, ProductSyncService
-                
-                # 1. Sync Products (Full details: images, brand, category, etc.)
-                # This might fail if API key doesn't have product permissions
-                products_result = {'products_synced': 0}
-                product_sync_error = None
-                
-                try:
-                    product_service = ProductSyncService(seller)
-                    products_result = product_service.sync_products()
-                except Exception as e:
-                    import logging
-                    logger = logging.getLogger(__name__)
-                    logger.warning(f"Product sync failed: {str(e)}")
-                    product_sync_error = str(e)
-                
-                # 2. Sync Orders
-                order_service = OrderSyncService(seller)
-                orders_fetched, orders_created, orders_updated = order_service.sync_orders(
-                    sync_type=sync_type,
-                    start_date=start_date,
-                    end_date=end_date
-                )
-                
-                msg = f'Senkronizasyon tamamlandı. {orders_fetched} sipariş çekildi.'
-                if products_result['products_synced'] > 0:
-                    msg += f' {products_result["products_synced"]} ürün detayları güncellendi.'
-                elif product_sync_error:
-                    msg += f' (Ürün senkronizasyonu uyarısı: {product_sync_error})'
-                
-                # 3. Enrich Products from Web (Fallback)
-                try:
-                    # Provide robustness: try to enrich missing details (images/brands)
-                    # even if API failed or returned partial data
-                    enrich_service = ProductSyncService(seller)
-                    enriched_count = enrich_service.enrich_products_from_web()
-                    if enriched_count > 0:
-                        msg += f' {enriched_count} eksik ürün için bilgiler web\'den tamamlandı.'
-                except Exception as e:
-                    logger.warning(f"Enrichment failed: {e}")
-                
-                return Response({
-                    'success': True,
-                    'message': msg,
-                    'data': {
-                        'seller_id': seller.id,
-                        'sync_status': seller.sync_status,
-                        'products_synced': products_result.get('products_synced', 0),
-                        'orders_fetched': orders_fetched,
-                        'orders_created': orders_created,
-                        'orders_updated': orders_updated,
-                        'product_sync_error': product_sync_error
-                    }
-                })
-            except Exception as e:
-                import traceback
-                error_detail = traceback.format_exc()
-                logger_msg = f'Sync error: {str(e)}\n{error_detail}'
-                seller.mark_sync_failed(str(e))
-                return Response({
-                    'success': False,
-                    'message': f'Senkronizasyon hatası: {str(e)}'
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            # Development (no Celery/Redis): run in a background thread so the
+            # request returns at once; progress is visible through
+            # SellerSyncStatusView and the sync logs
+            _dev_sync_executor.submit(_run_dev_sync, seller.id, sync_type, start_date, end_date)
+            
+            return Response({
+                'success': True,
+                'message': 'Senkronizasyon başlatıldı.',
+                'data': {
+                    'seller_id': seller.id,
+                    'sync_status': seller.sync_status,
+                }
+            }, status=status.HTTP_202_ACCEPTED)
         else:
             # Queue the sync task in production
             from apps.integrations.tasks import sync_seller_orders
@@ -213,9 +255,12 @@ class SellerSyncStatusView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request, pk):
-        try:
-            seller = SellerAccount.objects.get(pk=pk, user=request.user)
-        except SellerAccount.DoesNotExist:
+        # Status columns only; the encrypted credentials are not needed
+        seller = _get_owned_seller(request.user, pk, fields=(
+            'id', 'shop_name', 'sync_status', 'last_sync_at',
+            'last_sync_error', 'total_orders_synced',
+        ))
+        if seller is None:
             return Response({
                 'success': False,
                 'message': 'Satıcı hesabı bulunamadı.'
@@ -246,7 +291,7 @@ class SellerSyncLogsView(generics.ListAPIView):
         return SellerSyncLog.objects.filter(
             seller_account__user=self.request.user,
             seller_account_id=seller_id
-        ).order_by('-started_at')[:50]
+        ).only(*SYNC_LOG_SERIALIZER_FIELDS).order_by('-started_at')[:50]
 
 
 class TestCredentialsView(APIView):
@@ -256,9 +301,8 @@ class TestCredentialsView(APIView):
     permission_classes = [IsAuthenticated]
     
     def post(self, request, pk):
-        try:
-            seller = SellerAccount.objects.get(pk=pk, user=request.user)
-        except SellerAccount.DoesNotExist:
+        seller = _get_owned_seller(request.user, pk, fields=('id', 'seller_id', 'api_key', 'api_secret'))
+        if seller is None:
             return Response({
                 'success': False,
                 'message': 'Satıcı hesabı bulunamadı.'
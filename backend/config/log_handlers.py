@@ -0,0 +1,44 @@
+"""
+Logging Handlers
+
+Handlers that keep file I/O off the request/sync hot path.
+"""
+
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+
+class QueuedFileHandler(QueueHandler):
+    """
+    Rotating file handler whose writes happen on a background thread.
+
+    Records are formatted in the calling thread and put on a queue; a single
+    QueueListener thread owns the file and writes them out. Usable from
+    dictConfig like RotatingFileHandler (filename, maxBytes, backupCount).
+    """
+
+    def __init__(self, filename, maxBytes=0, backupCount=0, encoding='utf-8'):
+        super().__init__(queue.SimpleQueue())
+        self._file_handler = RotatingFileHandler(
+            filename,
+            maxBytes=maxBytes,
+            backupCount=backupCount,
+            encoding=encoding,
+            delay=True
+        )
+        self._listener = QueueListener(self.queue, self._file_handler)
+        self._listener.start()
+        atexit.register(self._stop_listener)
+
+    def _stop_listener(self):
+        """Flush queued records and stop the writer thread (idempotent)."""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+    def close(self):
+        self._stop_listener()
+        self._file_handler.close()
+        super().close()
@@ -346,6 +346,8 @@ ENCRYPTION_KEY = os.getenv('ENCRYPTION_KEY', '')
 # Trendyol API Settings
 TRENDYOL_API_BASE_URL = os.getenv('TRENDYOL_API_BASE_URL', 'https://api.trendyol.com/sapigw')
 TRENDYOL_RATE_LIMIT_PER_SECOND = int(os.getenv('TRENDYOL_RATE_LIMIT_PER_SECOND', 5))
+# Store full Trendyol payloads in raw_data (False keeps only the fields the app reads)
+TRENDYOL_STORE_RAW = os.getenv('TRENDYOL_STORE_RAW', 'True').lower() == 'true'
 
 # Default VAT rates (Turkey)
 DEFAULT_VAT_RATE = float(os.getenv('DEFAULT_VAT_RATE', 20.00))
@@ -34,6 +34,20 @@ LOGGING = {
             'class': 'logging.StreamHandler',
             'formatter': 'simple',
         },
+        'console_info': {
+            'level': 'INFO',
+            'class': 'logging.StreamHandler',
+            'formatter': 'simple',
+        },
+        # Sync/enrichment debug dumps, written by a background thread
+        'sync_debug_file': {
+            'level': 'DEBUG',
+            'class': 'config.log_handlers.QueuedFileHandler',
+            'filename': BASE_DIR / 'logs' / 'sync_debug.log',
+            'maxBytes': 10 * 1024 * 1024,  # 10MB
+            'backupCount': 3,
+            'formatter': 'verbose',
+        },
     },
     'root': {
         'handlers': ['console'],
@@ -50,6 +64,11 @@ LOGGING = {
             'level': 'DEBUG',
             'propagate': False,
         },
+        'apps.integrations': {
+            'handlers': ['console_info', 'sync_debug_file'],
+            'level': 'DEBUG',
+            'propagate': False,
+        },
     },
 }
 
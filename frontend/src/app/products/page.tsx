@@ -132,14 +132,33 @@ export default function ProductsPage() {
             return;
         }
 
+        if (fileInputRef.current) fileInputRef.current.value = '';
         try {
             const response = await productsAPI.updateFromExcel(file);
-            alert(response.data.message);
+            const upload = await waitForExcelUpdate(response.data.data.id);
+            if (upload.status === 'completed') {
+                alert(`${upload.success_count} ürün bilgisi Excel'den güncellendi.`);
+            } else if (upload.status === 'failed') {
+                alert(`Hata: ${upload.error_details?.[0]?.error || 'Dosya işlenemedi.'}`);
+            } else {
+                alert('Dosya hâlâ işleniyor, sonuçlar birazdan listede görünecek.');
+            }
             queryClient.invalidateQueries({ queryKey: ['products'] });
         } catch (error: any) {
             alert(`Hata: ${error.response?.data?.message || 'Yükleme başarısız.'}`);
         }
-        if (fileInputRef.current) fileInputRef.current.value = '';
+    };
+
+    // Poll the upload until the background task finishes (about 5 minutes at most)
+    const waitForExcelUpdate = async (uploadId: number) => {
+        let upload: any = null;
+        for (let attempt = 0; attempt < 150; attempt++) {
+            await new Promise((resolve) => setTimeout(resolve, 2000));
+            const response = await productsAPI.getUpdateFromExcelStatus(uploadId);
+            upload = response.data.data;
+            if (upload.status === 'completed' || upload.status === 'failed') break;
+        }
+        return upload;
     };
 
     // VAT rate options
@@ -358,6 +358,9 @@ export const productsAPI = {
             headers: { 'Content-Type': 'multipart/form-data' },
         });
     },
+
+    getUpdateFromExcelStatus: (id: number) =>
+        api.get(`/products/update-from-excel/${id}/status/`),
 };
 
 // Orders API